@@ -10,7 +10,7 @@ HEIGHT = 300
 
 class InteractiveCanvas(BaseCanvas):
     def __init__(self, width: int, height: int) -> None:
-        super().__init__(width, height)
+        super().__init__(width, height, transform_stack=True)
         self.old_point: Point | None = None
 
     def __add__(self, shape: Shape) -> "InteractiveCanvas":
@@ -206,6 +206,16 @@ def apply_scaling_around_point(
     apply_scaling(tk_canvas, canvas, center)
 
 
+def undo_transformation(tk_canvas: tkinter.Canvas, canvas: InteractiveCanvas) -> None:
+    if canvas.undo_transform():
+        draw_canvas(tk_canvas, canvas)
+
+
+def redo_transformation(tk_canvas: tkinter.Canvas, canvas: InteractiveCanvas) -> None:
+    if canvas.redo_transform():
+        draw_canvas(tk_canvas, canvas)
+
+
 if __name__ == "__main__":
     root = tkinter.Tk()
     root.title("Холст")
@@ -249,6 +259,15 @@ if __name__ == "__main__":
         command=lambda: apply_scaling_around_point(tk_canvas, canvas),
     )
     edit_menu.add_separator()
+    edit_menu.add_command(
+        label="Отменить преобразование",
+        command=lambda: undo_transformation(tk_canvas, canvas),
+    )
+    edit_menu.add_command(
+        label="Повторить преобразование",
+        command=lambda: redo_transformation(tk_canvas, canvas),
+    )
+    edit_menu.add_separator()
     edit_menu.add_command(
         label="Очистить холст", command=lambda: clear_canvas(tk_canvas, canvas)
     )
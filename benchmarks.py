@@ -0,0 +1,467 @@
+import math
+import random
+from itertools import combinations
+import time
+import tracemalloc
+from typing import Callable, Any
+
+import numpy as np
+
+from filling import RGB, Pixel
+from geometry import OCCUPANCY_BACKENDS, BaseCanvas, Point, Line, PointStore, affine_transform
+from intersection import (
+    POLYGON_OPERATIONS,
+    BoxTree,
+    EdgeTable,
+    SegmentGrid,
+    boxes_overlap,
+    intersecting_pairs,
+    polygon_boolean,
+)
+
+WIDTH = 300
+HEIGHT = 300
+
+
+class DictRGB:
+    # Layout of filling.RGB before __slots__ and interning, kept as a baseline.
+    def __init__(self, r: int, g: int, b: int) -> None:
+        self.r = r
+        self.g = g
+        self.b = b
+
+
+class DictPixel:
+    def __init__(self, x: float, y: float, color: DictRGB) -> None:
+        self.x = x
+        self.y = y
+        self.color = color
+
+
+def measure(build: Callable[[], Any]) -> tuple[int, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def bench_pixel_memory(width: int = WIDTH, height: int = HEIGHT, colors: int = 64, gradient: bool = False) -> None:
+    # A fill's worth of pixels drawn from a small palette, as Gouraud fills of
+    # flat-ish triangles produce, or from a smooth gradient where nearly every
+    # pixel has its own color.
+    def palette(x: int, y: int) -> tuple[int, int, int]:
+        if gradient:
+            return x % 256, y % 256, (x + y) // 2 % 256
+        shade = (x * 7 + y * 13) % colors * (256 // colors)
+        return shade, 255 - shade, shade // 2
+
+    def build_dict() -> list[DictPixel]:
+        return [DictPixel(x, y, DictRGB(*palette(x, y))) for x in range(width) for y in range(height)]
+
+    def build_slots() -> list[Pixel]:
+        return [Pixel(x, y, RGB(*palette(x, y))) for x in range(width) for y in range(height)]
+
+    RGB.interned.clear()
+    dict_size, dict_time = measure(build_dict)
+    RGB.interned.clear()
+    slots_size, slots_time = measure(build_slots)
+
+    print(f"Pixel memory for {width * height} pixels, {'gradient' if gradient else f'{colors} colors'}:")
+    print(f"  dict classes:    {dict_size / 2**20:8.2f} MiB  {dict_time:.3f} s")
+    print(f"  slots + interned:{slots_size / 2**20:8.2f} MiB  {slots_time:.3f} s")
+    print(f"  saving: {dict_size / slots_size:.1f}x, {len(RGB.interned)} colors left interned")
+
+
+def random_segments(count: int, length: float = 10.0, seed: int = 0) -> list[Line]:
+    # The area grows with the count so the density of crossings stays constant.
+    rng = random.Random(seed)
+    side = length * count ** 0.5
+    lines = list[Line]()
+    for _ in range(count):
+        x, y = rng.uniform(0, side), rng.uniform(0, side)
+        lines.append(Line(Point(x, y), Point(x + rng.uniform(-length, length), y + rng.uniform(-length, length))))
+    return lines
+
+
+def segment_intersection(a: tuple[float, float, float, float], b: tuple[float, float, float, float]) -> bool:
+    # TkinterCanvas.get_lines_intersection before the grid index and the
+    # vectorized kernel, kept as a baseline.
+    x1, y1, x2, y2 = a
+    x3, y3, x4, y4 = b
+    denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    if denom == 0:
+        return False
+
+    x = ((x1 * y2 - y1 * x2) * (x3 - x4) - (x1 - x2) * (x3 * y4 - y3 * x4)) / denom
+    y = ((x1 * y2 - y1 * x2) * (y3 - y4) - (y1 - y2) * (x3 * y4 - y3 * x4)) / denom
+    return (
+        min(x1, x2) <= x <= max(x1, x2)
+        and min(y1, y2) <= y <= max(y1, y2)
+        and min(x3, x4) <= x <= max(x3, x4)
+        and min(y3, y4) <= y <= max(y3, y4)
+    )
+
+
+def bench_segment_intersections(
+    sizes: tuple[int, ...] = (10**2, 10**3, 10**4, 10**5), pairwise_limit: int = 10**4, loop_limit: int = 3 * 10**3
+) -> None:
+    print("Segment intersections (grid index vs vectorized pairwise vs Python loop):")
+    for count in sizes:
+        lines = random_segments(count)
+
+        start = time.perf_counter()
+        hits = sum(1 for _ in intersecting_pairs(lines, indexed=True))
+        grid_time = time.perf_counter() - start
+
+        if count <= pairwise_limit:
+            start = time.perf_counter()
+            pairwise_hits = sum(1 for _ in intersecting_pairs(lines, indexed=False))
+            pairwise_time = time.perf_counter() - start
+            assert pairwise_hits == hits
+            pairwise = f"{pairwise_time:8.3f} s  ({pairwise_time / grid_time:.0f}x)"
+        else:
+            pairwise = "skipped (quadratic)"
+
+        if count <= loop_limit:
+            segments = [(line.start.x, line.start.y, line.end.x, line.end.y) for line in lines]
+            start = time.perf_counter()
+            loop_hits = sum(segment_intersection(a, b) for a, b in combinations(segments, 2))
+            loop_time = time.perf_counter() - start
+            assert loop_hits == hits
+            loop = f"{loop_time:8.3f} s  ({loop_time / grid_time:.0f}x)"
+        else:
+            loop = "skipped (quadratic)"
+
+        print(f"  n={count:>6}  k={hits:>6}  grid {grid_time:8.3f} s  pairwise {pairwise}  loop {loop}")
+
+
+def bench_incremental_grid(short: int = 500, long: int = 20) -> None:
+    # The grid TkinterCanvas keeps up to date: built over short lines in one
+    # corner, then given long lines one at a time.
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 100, (short, 2))
+    short_boxes = np.concatenate([starts, starts + rng.uniform(1, 8, (short, 2))], axis=1).tolist()
+    starts = rng.uniform(0, 100, (long, 2))
+    long_boxes = np.concatenate([starts, starts + rng.uniform(1400, 1500, (long, 2))], axis=1).tolist()
+
+    def add_long(fit: bool) -> tuple[float, SegmentGrid]:
+        grid = SegmentGrid(SegmentGrid.suggest_cell_size([tuple(box) for box in short_boxes]))
+        for key, box in enumerate(short_boxes):
+            grid.insert(key, tuple(box))
+        start = time.perf_counter()
+        for key, box in enumerate(long_boxes, start=short):
+            if fit:
+                grid.fit(tuple(box))
+            grid.query(tuple(box))
+            grid.insert(key, tuple(box))
+        return time.perf_counter() - start, grid
+
+    fixed_time, fixed = add_long(False)
+    fitted_time, fitted = add_long(True)
+    boxes = [tuple(box) for box in short_boxes + long_boxes]
+    start = time.perf_counter()
+    fresh = SegmentGrid(SegmentGrid.suggest_cell_size(boxes))
+    for key, box in enumerate(boxes):
+        fresh.insert(key, box)
+    fresh_time = time.perf_counter() - start
+    assert fixed.pairs() == fitted.pairs() == fresh.pairs()
+
+    print(f"Incremental grid, {long} long lines added to {short} short ones:")
+    print(f"  fixed cell size: {fixed_time:.3f} s  {len(fixed.cells)} cells")
+    print(f"  refitted:        {fitted_time:.3f} s  {len(fitted.cells)} cells")
+    print(f"  rebuilt once:    {fresh_time:.3f} s  {len(fresh.cells)} cells")
+
+
+def star_polygon(count: int, center: tuple[float, float], radius: float, spikes: float = 0.5, seed: int = 0) -> np.ndarray:
+    # A concave ring with jittered radii; spikes=0 gives a convex regular polygon.
+    rng = random.Random(seed)
+    points = list[tuple[float, float]]()
+    for k in range(count):
+        angle = 2 * math.pi * k / count
+        r = radius * (1 - spikes * rng.random()) if spikes else radius
+        points.append((center[0] + r * math.cos(angle), center[1] + r * math.sin(angle)))
+    return np.array(points, dtype=np.float64)
+
+
+def bench_polygon_boolean(sizes: tuple[int, ...] = (10**2, 10**3, 10**4)) -> None:
+    print("Polygon booleans (vertices per polygon):")
+    for count in sizes:
+        subject = star_polygon(count, (0.0, 0.0), 100.0, spikes=0.02, seed=1)
+        clip = star_polygon(count, (60.0, 20.0), 100.0, spikes=0.02, seed=2)
+        timings = list[str]()
+        for operation in POLYGON_OPERATIONS:
+            start = time.perf_counter()
+            rings = polygon_boolean(subject, clip, operation)
+            timings.append(f"{operation} {time.perf_counter() - start:7.3f} s ({len(rings)} rings)")
+
+        # A convex subject against a small convex window takes the Sutherland-Hodgman path.
+        convex_subject = star_polygon(count, (0.0, 0.0), 100.0, spikes=0)
+        window = star_polygon(8, (60.0, 20.0), 50.0, spikes=0)
+        start = time.perf_counter()
+        polygon_boolean(convex_subject, window)
+        convex_time = time.perf_counter() - start
+
+        print(f"  n={count:>6}  " + "  ".join(timings) + f"  convex window {convex_time:7.3f} s")
+
+
+def crossing_number(x: float, y: float, polygon: list[tuple[float, float]]) -> bool:
+    # The per-point loop of TkinterCanvas.checkIfPointWithin before edge tables,
+    # kept as a baseline.
+    inside = False
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[(i - 1) % len(polygon)]
+        if ((yi > y) != (yj > y)) and (x <= (xj - xi) * (y - yi) / (yj - yi) + xi):
+            inside = not inside
+    return inside
+
+
+def bench_point_in_polygon(
+    sizes: tuple[int, ...] = (10**2, 10**3, 10**4), queries: int = 10**5, loop_queries: int = 10**3
+) -> None:
+    print(f"Point in polygon ({queries} queries, loop timed on {loop_queries} and scaled):")
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-110.0, 110.0, (queries, 2))
+    for count in sizes:
+        ring = star_polygon(count, (0.0, 0.0), 100.0, spikes=0.02, seed=count)
+
+        start = time.perf_counter()
+        table = EdgeTable(ring)
+        inside = table.contains(points)
+        table_time = time.perf_counter() - start
+
+        polygon = [(x, y) for x, y in ring.tolist()]
+        start = time.perf_counter()
+        expected = [crossing_number(x, y, polygon) for x, y in points[:loop_queries].tolist()]
+        loop_time = (time.perf_counter() - start) * queries / loop_queries
+        assert expected == inside[:loop_queries].tolist()
+
+        print(f"  n={count:>6}  edge table {table_time:7.3f} s  loop {loop_time:8.3f} s  ({loop_time / table_time:.0f}x)")
+
+
+def bench_polygon_index(sizes: tuple[int, ...] = (10**3, 3 * 10**3, 10**4), queries: int = 10**3) -> None:
+    # Bounding boxes of map-like polygons: mostly small, a few large ones.
+    print(f"Polygon bounding-box index ({queries} point queries):")
+    rng = random.Random(0)
+    for count in sizes:
+        side = 20.0 * count ** 0.5
+        boxes = list[tuple[float, float, float, float]]()
+        for _ in range(count):
+            x, y = rng.uniform(0, side), rng.uniform(0, side)
+            w, h = rng.expovariate(1 / 15.0), rng.expovariate(1 / 15.0)
+            boxes.append((x, y, x + w, y + h))
+        points = [(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(queries)]
+
+        start = time.perf_counter()
+        tree = BoxTree()
+        for key, box in enumerate(boxes):
+            tree.insert(key, box)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pairs = tree.pairs()
+        pairs_time = time.perf_counter() - start
+        start = time.perf_counter()
+        hits = [tree.query_point(x, y) for x, y in points]
+        query_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scan_pairs = [(a, b) for a, b in combinations(range(count), 2) if boxes_overlap(boxes[a], boxes[b])]
+        scan_pairs_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scan_hits = [{key for key, box in enumerate(boxes) if boxes_overlap((x, y, x, y), box)} for x, y in points]
+        scan_query_time = time.perf_counter() - start
+        assert pairs == scan_pairs and hits == scan_hits
+
+        print(
+            f"  n={count:>6}  build {build_time:6.3f} s"
+            f"  pairs {pairs_time:6.3f} s vs {scan_pairs_time:7.3f} s"
+            f"  points {query_time:6.3f} s vs {scan_query_time:6.3f} s"
+        )
+
+
+def bench_point_store(count: int = 10**6) -> None:
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, WIDTH, count)
+    y = rng.uniform(0, HEIGHT, count)
+    coords = list(zip(x.tolist(), y.tolist()))
+
+    def build_objects() -> list[Point]:
+        return [Point(px, py) for px, py in coords]
+
+    def build_store() -> PointStore:
+        return PointStore.from_arrays(x, y)
+
+    def append_store() -> PointStore:
+        store = PointStore()
+        for px, py in coords:
+            store.append(Point(px, py))
+        return store
+
+    objects_size, objects_time = measure(build_objects)
+    store_size, store_time = measure(build_store)
+    append_size, append_time = measure(append_store)
+
+    print(f"Point storage for {count} points (times include tracemalloc overhead):")
+    print(f"  Point objects:     {objects_size / 2**20:8.2f} MiB  {objects_time:.3f} s")
+    print(f"  PointStore bulk:   {store_size / 2**20:8.2f} MiB  {store_time:.3f} s  ({objects_size / store_size:.1f}x)")
+    print(f"  PointStore append: {append_size / 2**20:8.2f} MiB  {append_time:.3f} s  ({objects_size / append_size:.1f}x)")
+
+
+def bench_point_edits(count: int = 2 * 10**5, removals: int = 2000, middle_removals: int = 200) -> None:
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, WIDTH, count)
+    y = rng.uniform(0, HEIGHT, count)
+    points = [Point(px, py) for px, py in zip(x.tolist(), y.tolist())]
+    front = points[:removals]
+    middle = points[count // 2:count // 2 + middle_removals]
+
+    def remove_all(container: Any, targets: list[Point]) -> float:
+        start = time.perf_counter()
+        for point in targets:
+            container.remove(point)
+        return time.perf_counter() - start
+
+    def iterate(container: Any) -> float:
+        start = time.perf_counter()
+        total = 0.0
+        for point in container:
+            total += point.x + point.y
+        return time.perf_counter() - start
+
+    objects, store = list(points), PointStore.from_arrays(x, y)
+    print(f"Point edits on {count} points, list of Points vs PointStore:")
+    print(f"  remove {removals} from the front: {remove_all(objects, front):.3f} s vs {remove_all(store, front):.3f} s")
+    print(
+        f"  remove {middle_removals} from the middle: "
+        f"{remove_all(objects, middle):.3f} s vs {remove_all(store, middle):.3f} s"
+    )
+    print(f"  iterate: {iterate(objects):.3f} s vs {iterate(store):.3f} s")
+    assert [(p.x, p.y) for p in objects] == [(p.x, p.y) for p in store]
+
+
+def bench_affine_transform(sizes: tuple[int, ...] = (10**3, 10**4, 10**5)) -> None:
+    print("Affine transforms (batched product vs per-point matvec):")
+    matrix = np.array([[0.9, 0.2, 5.0], [-0.1, 1.1, -3.0], [0.0, 0.0, 1.0]])
+    rng = np.random.default_rng(0)
+    for count in sizes:
+        coordinates = rng.uniform(0, WIDTH, (count, 2))
+
+        start = time.perf_counter()
+        moved = affine_transform(matrix, coordinates)
+        batched_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        looped = [(matrix @ np.array([x, y, 1]))[:2] for x, y in coordinates.tolist()]
+        loop_time = time.perf_counter() - start
+        assert np.allclose(moved, looped)
+
+        print(f"  n={count:>6}  batched {batched_time:8.4f} s  loop {loop_time:7.3f} s  ({loop_time / batched_time:.0f}x)")
+
+
+def bench_transform_stack(count: int = 10**5, steps: int = 24) -> None:
+    # A full turn in small rotations about the centre, applied eagerly and
+    # through the transform stack.
+    print(f"Transform stack ({count} points, {steps} rotations of {360 / steps:.0f} degrees):")
+    angle = 2 * math.pi / steps
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    cx, cy = WIDTH / 2, HEIGHT / 2
+    rotation = np.array([
+        [cos_a, -sin_a, cx - cos_a * cx + sin_a * cy],
+        [sin_a, cos_a, cy - sin_a * cx - cos_a * cy],
+        [0.0, 0.0, 1.0],
+    ])
+    rng = np.random.default_rng(0)
+    x = rng.integers(WIDTH // 4, 3 * WIDTH // 4, count).astype(np.float64)
+    y = rng.integers(HEIGHT // 4, 3 * HEIGHT // 4, count).astype(np.float64)
+    source = set(zip(x.tolist(), y.tolist()))
+
+    for stacked in (False, True):
+        canvas = BaseCanvas(WIDTH, HEIGHT, transform_stack=stacked)
+        canvas.points = PointStore.from_arrays(x, y)
+        start = time.perf_counter()
+        for _ in range(steps):
+            canvas.transform(rotation)
+        transform_time = time.perf_counter() - start
+        start = time.perf_counter()
+        points = canvas.points
+        read_time = time.perf_counter() - start
+        moved = set(zip(points.x.tolist(), points.y.tolist()))
+        name = "stacked" if stacked else "eager"
+        print(
+            f"  {name:>7}  transforms {transform_time:7.4f} s  first read {read_time:7.4f} s"
+            f"  points off their start {len(source - moved):>6}"
+        )
+
+
+def bench_occupancy(side: int = 10**4, counts: tuple[int, ...] = (10**3, 10**5), queries: int = 10**4) -> None:
+    print(f"Occupancy backends on a {side}x{side} canvas ({queries} membership queries):")
+    rng = np.random.default_rng(0)
+    for count in counts:
+        x = rng.integers(0, side - 1, count).astype(np.float64)
+        y = rng.integers(0, side - 1, count).astype(np.float64)
+        probes = [Point(px, py) for px, py in rng.integers(0, side - 1, (queries, 2)).tolist()]
+        for name in (*OCCUPANCY_BACKENDS, None):
+            canvas = BaseCanvas(side, side, occupancy=name)
+            start = time.perf_counter()
+            canvas.scatter_grid(x, y)
+            build_time = time.perf_counter() - start
+            start = time.perf_counter()
+            hits = sum(probe in canvas for probe in probes)
+            query_time = time.perf_counter() - start
+            label = name or "auto (" + type(canvas.occupancy).__name__ + ")"
+            print(
+                f"  n={count:>6}  {label:<26} {canvas.occupancy.nbytes / 2**20:8.2f} MiB"
+                f"  build {build_time:6.3f} s  queries {query_time:6.3f} s  ({hits} hits)"
+            )
+
+
+def bench_occupied_iteration(side: int = 4000, count: int = 10**6, loop_rows: int = 40) -> None:
+    # The old BaseCanvas.__next__ walked the grid in a Python double loop; one
+    # such pass is timed on loop_rows rows and scaled to the canvas.
+    print(f"Occupied-cell iteration on a {side}x{side} canvas with {count} points:")
+    rng = np.random.default_rng(0)
+    x = rng.integers(0, side - 1, count).astype(np.float64)
+    y = rng.integers(0, side - 1, count).astype(np.float64)
+    region = (side // 4, side // 4, side // 2, side // 2)
+    for name in OCCUPANCY_BACKENDS:
+        canvas = BaseCanvas(side, side, occupancy=name)
+        canvas.scatter_grid(x, y)
+
+        start = time.perf_counter()
+        found = sum(len(batch) for batch in canvas.occupied_cells())
+        batch_time = time.perf_counter() - start
+        start = time.perf_counter()
+        in_region = sum(len(batch) for batch in canvas.occupied_cells(region=region))
+        region_time = time.perf_counter() - start
+
+        grid = canvas.grid_matrix
+        start = time.perf_counter()
+        looped = sum(1 for row in range(loop_rows) for column in range(side) if grid[row, column])
+        loop_time = (time.perf_counter() - start) * side / loop_rows
+        assert looped == int(grid[:loop_rows].sum())
+
+        print(
+            f"  {name:<7} {found} cells in {batch_time:6.3f} s"
+            f"  region {in_region} in {region_time:6.3f} s  double loop {loop_time:7.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    bench_pixel_memory()
+    bench_pixel_memory(600, 600, gradient=True)
+    bench_segment_intersections()
+    bench_incremental_grid()
+    bench_polygon_boolean()
+    bench_point_in_polygon()
+    bench_polygon_index()
+    bench_point_store()
+    bench_point_edits()
+    bench_affine_transform()
+    bench_transform_stack()
+    bench_occupancy()
+    bench_occupied_iteration()
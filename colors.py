@@ -1,25 +1,106 @@
+import argparse
+import glob
+import os
+import sys
+import time
 import tkinter
 from tkinter import filedialog
 from PIL.ImageFile import ImageFile
 from PIL import ImageTk, Image
-from typing import Callable
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from functools import partial
+from itertools import islice
+from typing import Callable, Sequence
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.container import BarContainer
+from matplotlib.figure import Figure
 
-root = tkinter.Tk()
-root.title("Image Viewer")
+IMAGE_FILETYPES = [("Image Files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif;*.ppm;*.pgm;*.tif;*.tiff")]
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".ppm", ".pgm", ".tif", ".tiff")
+
+Weights = tuple[float, float, float]
+
+BT601: Weights = (0.299, 0.587, 0.114)
+BT709: Weights = (0.2126, 0.7152, 0.0722)
+
+DIFF_BLOCK_ROWS = 256
+TILE_ROWS = 512
+
+CacheKey = tuple[str, float, int, bool]
+
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+FULL_POLL_MS = 50
+HISTOGRAM_TITLE = "Color Histogram"
+
+
+class ImageCache:
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError("Cache memory limit must be positive, got " + str(max_bytes))
+
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[CacheKey, tuple[Image.Image, ImageTk.PhotoImage | None]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(entries={len(self.entries)}, size={self.size}, max_bytes={self.max_bytes})"
+
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self.entries
+
+    def get(self, key: CacheKey) -> tuple[Image.Image, ImageTk.PhotoImage | None] | None:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, image: Image.Image, tk_image: ImageTk.PhotoImage | None = None) -> None:
+        if key in self.entries:
+            self.size -= self.entry_size(*self.entries.pop(key))
+
+        self.entries[key] = (image, tk_image)
+        self.size += self.entry_size(image, tk_image)
+
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, old_entry = self.entries.popitem(last=False)
+            self.size -= self.entry_size(*old_entry)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
+
+    @staticmethod
+    def entry_size(image: Image.Image, tk_image: ImageTk.PhotoImage | None = None) -> int:
+        # The PhotoImage keeps its own RGBA copy of the pixels next to the PIL image.
+        width, height = image.size
+        return width * height * (len(image.getbands()) + (4 if tk_image is not None else 0))
 
-file_path = filedialog.askopenfilename(
-    filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif")]
-)
 
 class Canvas:
-    def __init__(self, image_path: str, root: tkinter.Tk):
+    def __init__(
+        self,
+        image_path: str,
+        root: tkinter.Tk,
+        cache_max_bytes: int = CACHE_MAX_BYTES,
+        preview_size: tuple[int, int] | None = None,
+    ):
         self.root = root
         self.root.title("Image Viewer")
         self.image_path = image_path
-        img = Image.open(image_path)
-        tk_img = ImageTk.PhotoImage(img)
+        self.cache = ImageCache(cache_max_bytes)
+        self.preview_size = preview_size or (
+            self.root.winfo_screenwidth() * 3 // 4,
+            self.root.winfo_screenheight() * 3 // 4,
+        )
+        self.full_size = False
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending: dict[CacheKey, list[Callable[[Image.Image], None]]] = {}
+
+        img, tk_img = self.render(0)
         self.label = tkinter.Label(self.root, image=tk_img)
         self.label.__setattr__('image', tk_img)
         self.label.pack()
@@ -28,114 +109,509 @@ class Canvas:
         menubar = tkinter.Menu(self.root)
         file_menu = tkinter.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Открыть изображение", command=self.open_image)
+        file_menu.add_command(label="Сохранить изображение", command=self.save_image)
         file_menu.add_command(label="Переключить режим", command=self.to_shades_of_gray)
+        file_menu.add_command(label="Полный размер", command=self.toggle_full_size)
         file_menu.add_separator()
         file_menu.add_command(label="Выход", command=self.root.quit)
         menubar.add_cascade(label="Файл", menu=file_menu)
         self.root.config(menu=menubar)
-        show_histogram(img)
-
-    def apply_grayscale_formula(self, img: ImageFile, formula: Callable[[int, int, int], float]) -> Image.Image:
-        gray_img = img.convert("RGB").copy()
-        pixels = gray_img.load()
-        if not pixels:
-            raise ValueError("Failed to load image pixels.")
-        width, height = gray_img.size
-        for x in range(width):
-            for y in range(height):
-                r, g, b = pixels[x, y]
-                gray = int(formula(r, g, b))
-                pixels[x, y] = (gray, gray, gray)
-        return gray_img
+        show_histogram(img, self.histogram_title(img))
+
+    def apply_grayscale_formula(self, img: ImageFile | Image.Image, weights: Weights) -> Image.Image:
+        return Image.fromarray(grayscale_array(img, weights)).convert("RGB")
     
-    def grayscale_diff(self, img: ImageFile) -> Image.Image:
-        gray_img0 = self.apply_grayscale_formula(img, lambda r, g, b: 0.299 * r + 0.587 * g + 0.114 * b)
-        gray_img1 = self.apply_grayscale_formula(img, lambda r, g, b: 0.2126 * r + 0.7152 * g + 0.0722 * b)
-        diff_img = Image.new("RGB", img.size)
-        pixels0 = gray_img0.load()
-        pixels1 = gray_img1.load()
-        diff_pixels = diff_img.load()
-        width, height = img.size
-        if not pixels0 or not pixels1 or not diff_pixels:
-            raise ValueError("Failed to load image pixels.")
-
-        for x in range(width):
-            for y in range(height):
-                gray0 = pixels0[x, y][0]
-                gray1 = pixels1[x, y][0]
-                diff = abs(gray0 - gray1)
-                diff_pixels[x, y] = (diff, diff, diff)
-        return diff_img
+    def grayscale_diff(self, img: ImageFile | Image.Image) -> Image.Image:
+        return Image.fromarray(grayscale_diff_array(img, BT601, BT709)).convert("RGB")
+
+    def load_source(self, path: str, full: bool, mtime: float | None = None) -> Image.Image:
+        image = Image.open(path)
+        if full:
+            image.load()
+        else:
+            # thumbnail() lets JPEG decode straight at a reduced scale.
+            image.thumbnail(self.preview_size)
+        if mtime is not None and os.path.getmtime(path) != mtime:
+            raise OSError(path + " changed while it was being loaded")
+        return image
+
+    def make_mode_image(self, mode: int, source: Image.Image) -> Image.Image:
+        if mode == 0:
+            return source
+        if mode == 1:
+            return self.apply_grayscale_formula(source, BT601)
+        if mode == 2:
+            return self.apply_grayscale_formula(source, BT709)
+        if mode == 3:
+            return self.grayscale_diff(source)
+        raise ValueError("Unknown display mode: " + str(mode))
+
+    def histogram_title(self, image: Image.Image) -> str:
+        # Displayed images are usually previews, so their counts are too.
+        with Image.open(self.image_path) as source:
+            width, height = source.size
+        if image.size == (width, height):
+            return HISTOGRAM_TITLE
+        return f"{HISTOGRAM_TITLE} (preview, {image.width}x{image.height} of {width}x{height})"
+
+    def cache_key(self, mode: int, full: bool) -> CacheKey:
+        return (self.image_path, os.path.getmtime(self.image_path), mode, full)
+
+    def render(self, mode: int, full: bool = False) -> tuple[Image.Image, ImageTk.PhotoImage]:
+        key = self.cache_key(mode, full)
+        entry = self.cache.get(key)
+        if entry is None:
+            source = self.load_source(self.image_path, full) if mode == 0 else self.render(0, full)[0]
+            entry = (self.make_mode_image(mode, source), None)
+
+        image, tk_image = entry
+        if tk_image is None:
+            tk_image = ImageTk.PhotoImage(image)
+            self.cache.put(key, image, tk_image)
+        return image, tk_image
+
+    def request_full(self, mode: int, callback: Callable[[Image.Image], None]) -> None:
+        key = self.cache_key(mode, True)
+        entry = self.cache.get(key)
+        if entry is not None:
+            callback(entry[0])
+            return
+
+        if key in self.pending:
+            self.pending[key].append(callback)
+            return
+        self.pending[key] = [callback]
+
+        source_key = self.cache_key(0, True)
+        source_entry = self.cache.get(source_key)
+        source = source_entry[0] if source_entry else None
+        # The job runs later, possibly after another image was opened, so it
+        # loads the file the key was made for.
+        path, mtime = key[0], key[1]
+
+        def work() -> tuple[Image.Image, Image.Image]:
+            full_source = source if source is not None else self.load_source(path, True, mtime)
+            return full_source, self.make_mode_image(mode, full_source)
+
+        self.poll_full(self.executor.submit(work), key, source_key)
+
+    def poll_full(self, future: Future[tuple[Image.Image, Image.Image]], key: CacheKey, source_key: CacheKey) -> None:
+        # Tk is not thread-safe, so results are picked up from the main loop.
+        if not future.done():
+            self.root.after(FULL_POLL_MS, self.poll_full, future, key, source_key)
+            return
+
+        callbacks = self.pending.pop(key, [])
+        try:
+            source, image = future.result()
+        except Exception as error:
+            print(f"{key[0]}: {error}", file=sys.stderr)
+            return
+
+        if source_key not in self.cache:
+            self.cache.put(source_key, source)
+        self.cache.put(key, image)
+        for callback in callbacks:
+            callback(image)
+
+    def show(self, tk_img: ImageTk.PhotoImage) -> None:
+        self.label.config(image=tk_img)
+        self.label.__setattr__('image', tk_img)
+
+    def show_current(self) -> Image.Image:
+        img, tk_img = self.render(self.gray_mode)
+        self.show(tk_img)
+
+        if self.full_size:
+            path, mode = self.image_path, self.gray_mode
+
+            def show_full(_: Image.Image) -> None:
+                if self.full_size and self.image_path == path and self.gray_mode == mode:
+                    self.show(self.render(mode, True)[1])
+
+            self.request_full(mode, show_full)
+        return img
 
     def to_shades_of_gray(self):
         if not self.image_path:
             return
-        
-        img = None
-        if self.gray_mode == 0:
-            self.gray_mode = 1
-            image = Image.open(self.image_path)
-            img = self.apply_grayscale_formula(image, lambda r, g, b: 0.299 * r + 0.587 * g + 0.114 * b)
-            tk_gray_img = ImageTk.PhotoImage(img)
-            self.label.config(image=tk_gray_img)
-            self.label.__setattr__('image', tk_gray_img)
-        elif self.gray_mode == 1:
-            self.gray_mode = 2
-            image = Image.open(self.image_path)
-            img = self.apply_grayscale_formula(image, lambda r, g, b: 0.2126 * r + 0.7152 * g + 0.0722 * b)
-            tk_gray_img = ImageTk.PhotoImage(img)
-            self.label.config(image=tk_gray_img)
-            self.label.__setattr__('image', tk_gray_img)
-        elif self.gray_mode == 2:
-            self.gray_mode = 3
-            image = Image.open(self.image_path)
-            img = self.grayscale_diff(image)
-            tk_gray_img = ImageTk.PhotoImage(img)
-            self.label.config(image=tk_gray_img)
-            self.label.__setattr__('image', tk_gray_img)
-        elif self.gray_mode == 3:
-            self.gray_mode = 0
-            image = Image.open(self.image_path)
-            tk_img = ImageTk.PhotoImage(image)
-            self.label.config(image=tk_img)
-            self.label.__setattr__('image', tk_img)
-        
-        if img:
-            show_histogram(img)
+
+        self.gray_mode = (self.gray_mode + 1) % 4
+        img = self.show_current()
+
+        if self.gray_mode != 0:
+            show_histogram(img, self.histogram_title(img))
+
+    def toggle_full_size(self) -> None:
+        self.full_size = not self.full_size
+        self.show_current()
+
+    def save_image(self) -> None:
+        save_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=IMAGE_FILETYPES)
+        if not save_path:
+            return
+        self.request_full(self.gray_mode, lambda image: image.save(save_path))
         
     def open_image(self):
-        file_path = filedialog.askopenfilename(
-            filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif")]
-        )
+        file_path = filedialog.askopenfilename(filetypes=IMAGE_FILETYPES)
         if not file_path:
             return
         self.label.pack_forget()
         self.label.destroy()
         self.image_path = file_path
-        img = Image.open(file_path)
-        tk_img = ImageTk.PhotoImage(img)
+        self.gray_mode = 0
+        _, tk_img = self.render(0)
         self.label = tkinter.Label(self.root, image=tk_img)
         self.label.__setattr__('image', tk_img)
         self.label.pack()
-        self.gray_mode = 0
+        if self.full_size:
+            self.show_current()
+
+def grayscale_rgb(rgb: np.ndarray, weights: Weights) -> np.ndarray:
+    wr, wg, wb = weights
+    r = rgb[..., 0].astype(np.float64)
+    g = rgb[..., 1].astype(np.float64)
+    b = rgb[..., 2].astype(np.float64)
+    gray = wr * r + wg * g + wb * b
+    return np.clip(gray, 0, 255).astype(np.uint8)
+
+def grayscale_array(img: Image.Image, weights: Weights) -> np.ndarray:
+    return grayscale_rgb(np.asarray(img.convert("RGB")), weights)
+
+def grayscale_diff_rgb(rgb: np.ndarray, weights0: Weights = BT601, weights1: Weights = BT709) -> np.ndarray:
+    gray0 = grayscale_rgb(rgb, weights0).astype(np.int16)
+    return np.abs(gray0 - grayscale_rgb(rgb, weights1)).astype(np.uint8)
+
+def grayscale_diff_array(
+    img: Image.Image,
+    weights0: Weights = BT601,
+    weights1: Weights = BT709,
+    block_rows: int = DIFF_BLOCK_ROWS,
+) -> np.ndarray:
+    width, height = img.size
+    diff = np.empty((height, width), dtype=np.uint8)
+
+    # np.asarray copies a whole image even when it is already RGB, so only
+    # one band of rows is copied, and converted if need be, at a time.
+    for top in range(0, height, block_rows):
+        band = img.crop((0, top, width, min(top + block_rows, height)))
+        if band.mode != "RGB":
+            band = band.convert("RGB")
+        diff[top:top + block_rows] = grayscale_diff_rgb(np.asarray(band), weights0, weights1)
+
+    return diff
+
+def rgb_histogram(rgb: np.ndarray) -> np.ndarray:
+    return np.stack([
+        np.bincount(rgb[..., channel].ravel(), minlength=256)
+        for channel in range(3)
+    ]).astype(np.int64)
+
+
+class StripReader:
+    def __init__(self, path: str) -> None:
+        self.image = Image.open(path)
+        self.width, self.height = self.image.size
+        self.raw = self.map_raw()
+        if self.raw is None:
+            # Formats without a raw RGB layout are decoded once up front so
+            # that worker threads never race on the lazy load.
+            self.image.load()
+
+    def map_raw(self) -> np.ndarray | None:
+        if self.image.mode != "RGB" or len(self.image.tile) != 1:
+            return None
+
+        codec, extents, offset, args = self.image.tile[0]
+        # Other codecs (JPEG's args are a 2-tuple) have no raw layout to map.
+        if codec != "raw":
+            return None
+
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else args
+        if (
+            tuple(extents) != (0, 0, self.width, self.height)
+            or rawmode != "RGB"
+            or stride not in (0, self.width * 3)
+            or orientation != 1
+            or not isinstance(self.image.filename, str)
+        ):
+            return None
+
+        return np.memmap(
+            self.image.filename, dtype=np.uint8, mode="r", offset=offset,
+            shape=(self.height, self.width, 3),
+        )
+
+    def read(self, top: int, bottom: int) -> np.ndarray:
+        if self.raw is not None:
+            return np.array(self.raw[top:bottom])
+        return np.asarray(self.image.crop((0, top, self.width, bottom)).convert("RGB"))
+
+    def close(self) -> None:
+        self.raw = None
+        self.image.close()
+
+
+def process_tiled(
+    path: str,
+    kernel: Callable[[np.ndarray], np.ndarray],
+    out_path: str | None = None,
+    tile_rows: int = TILE_ROWS,
+    workers: int | None = None,
+) -> np.ndarray | None:
+    # Uncompressed RGB sources (PPM, raw TIFF) are memory-mapped and read strip
+    # by strip; ".pgm" outputs are streamed, anything else is assembled into a
+    # single uint8 plane. The result is returned only when out_path is None.
+    if tile_rows <= 0:
+        raise ValueError("Tile height must be positive, got " + str(tile_rows))
+
+    reader = StripReader(path)
+    width, height = reader.width, reader.height
+    workers = workers or os.cpu_count() or 1
+    stream = out_path is not None and out_path.lower().endswith(".pgm")
+    plane = None if stream else np.empty((height, width), dtype=np.uint8)
+
+    def work(top: int) -> tuple[int, np.ndarray]:
+        return top, kernel(reader.read(top, min(top + tile_rows, height)))
+
+    try:
+        with ExitStack() as stack:
+            out_file = stack.enter_context(open(out_path, "wb")) if stream and out_path else None
+            if out_file:
+                out_file.write(f"P5\n{width} {height}\n255\n".encode("ascii"))
+
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+            pending = deque[Future[tuple[int, np.ndarray]]]()
+            tops = iter(range(0, height, tile_rows))
+
+            # Keep at most two strips per worker in flight so finished strips
+            # cannot pile up while an earlier one is still being written.
+            for top in islice(tops, workers * 2):
+                pending.append(executor.submit(work, top))
+            while pending:
+                top, strip = pending.popleft().result()
+                if out_file:
+                    out_file.write(strip.tobytes())
+                elif plane is not None:
+                    plane[top:top + len(strip)] = strip
+                for next_top in islice(tops, 1):
+                    pending.append(executor.submit(work, next_top))
+    finally:
+        reader.close()
+
+    if plane is not None and out_path is not None:
+        Image.fromarray(plane).save(out_path)
+        return None
+    return plane
+
+
+def tiled_histogram(path: str, tile_rows: int = TILE_ROWS) -> np.ndarray:
+    reader = StripReader(path)
+    counts = np.zeros((3, 256), dtype=np.int64)
+    try:
+        for top in range(0, reader.height, tile_rows):
+            counts += rgb_histogram(reader.read(top, min(top + tile_rows, reader.height)))
+    finally:
+        reader.close()
+    return counts
+
+def histogram_counts(image: Image.Image) -> np.ndarray:
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.array(image.histogram(), dtype=np.int64).reshape(3, 256)
+
+
+class HistogramPanel:
+    def __init__(self) -> None:
+        self.figure: Figure | None = None
+        self.axes: Axes | None = None
+        self.bars: list[BarContainer] = []
+
+    def is_open(self) -> bool:
+        return self.figure is not None and plt.fignum_exists(self.figure.number)
+
+    def create(self) -> None:
+        self.figure, self.axes = plt.subplots(figsize=(10, 5))
+        intensities = np.arange(256)
+        empty = np.zeros(256)
+        self.bars = [
+            self.axes.bar(intensities, empty, width=1.0, color=color, alpha=0.5, label=label)
+            for color, label in (
+                ('red', 'Red Channel'),
+                ('green', 'Green Channel'),
+                ('blue', 'Blue Channel'),
+            )
+        ]
+        self.axes.set_xlim(-0.5, 255.5)
+        self.axes.set_xlabel('Pixel Intensity')
+        self.axes.set_ylabel('Frequency')
+        self.axes.legend()
+
+    def update(self, counts: np.ndarray, title: str = HISTOGRAM_TITLE) -> None:
+        if counts.shape != (3, 256):
+            raise ValueError("Histogram counts must have shape (3, 256), got " + str(counts.shape))
+        if not self.is_open():
+            self.create()
+        assert self.figure is not None and self.axes is not None
+
+        for bars, channel in zip(self.bars, counts):
+            for bar, count in zip(bars, channel):
+                bar.set_height(count)
+        self.axes.set_ylim(0, max(int(counts.max()), 1) * 1.05)
+        self.axes.set_title(title)
+
+        self.figure.canvas.draw_idle()
+        plt.show(block=False)
+
+
+histogram_panel = HistogramPanel()
+
+def show_histogram(image: Image.Image, title: str = HISTOGRAM_TITLE) -> np.ndarray:
+    counts = histogram_counts(image)
+    histogram_panel.update(counts, title)
+    return counts
+
+BATCH_MODES = ("bt601", "bt709", "diff", "histogram")
+
+
+def collect_images(patterns: Sequence[str]) -> list[str]:
+    paths = list[str]()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+
+        for path in sorted(candidates):
+            if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(path)
+    return paths
+
+
+def mode_kernel(mode: str) -> Callable[[np.ndarray], np.ndarray]:
+    if mode == "bt601":
+        return partial(grayscale_rgb, weights=BT601)
+    if mode == "bt709":
+        return partial(grayscale_rgb, weights=BT709)
+    if mode == "diff":
+        return grayscale_diff_rgb
+    raise ValueError("Unknown batch mode: " + mode)
+
+
+def process_image(path: str, output_dir: str, modes: Sequence[str]) -> list[str]:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    written = list[str]()
+
+    with Image.open(path) as image:
+        image.load()
+        for mode in modes:
+            if mode == "histogram":
+                out_path = os.path.join(output_dir, f"{stem}_histogram.npy")
+                np.save(out_path, histogram_counts(image))
+            elif mode == "diff":
+                out_path = os.path.join(output_dir, f"{stem}_{mode}.png")
+                Image.fromarray(grayscale_diff_array(image)).save(out_path)
+            else:
+                out_path = os.path.join(output_dir, f"{stem}_{mode}.png")
+                Image.fromarray(mode_kernel(mode)(np.asarray(image.convert("RGB")))).save(out_path)
+            written.append(out_path)
+
+    return written
+
+
+def process_image_tiled(
+    path: str,
+    output_dir: str,
+    modes: Sequence[str],
+    tile_rows: int = TILE_ROWS,
+    workers: int | None = None,
+    extension: str = "png",
+) -> list[str]:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    written = list[str]()
+
+    for mode in modes:
+        if mode == "histogram":
+            out_path = os.path.join(output_dir, f"{stem}_histogram.npy")
+            np.save(out_path, tiled_histogram(path, tile_rows))
+        else:
+            out_path = os.path.join(output_dir, f"{stem}_{mode}.{extension}")
+            process_tiled(path, mode_kernel(mode), out_path, tile_rows, workers)
+        written.append(out_path)
+
+    return written
+
+
+def run_batch(
+    paths: Sequence[str],
+    output_dir: str,
+    modes: Sequence[str] = BATCH_MODES,
+    workers: int | None = None,
+    tile_rows: int | None = None,
+    extension: str = "png",
+) -> float:
+    # Tiled runs handle one image at a time and spend the workers on its strips,
+    # so peak memory stays bounded by a single image instead of one per process.
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    done = 0
+
+    def report(path: str, result: Callable[[], list[str]]) -> None:
+        nonlocal done
+        try:
+            result()
+        except Exception as error:
+            print(f"{path}: {error}", file=sys.stderr)
+            return
+        done += 1
+        print(f"[{done}/{len(paths)}] {path}")
+
+    if tile_rows:
+        for path in paths:
+            report(path, partial(process_image_tiled, path, output_dir, modes, tile_rows, workers, extension))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_image, path, output_dir, modes): path for path in paths}
+            for future in as_completed(futures):
+                report(futures[future], future.result)
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {done} images in {elapsed:.2f} s ({rate:.2f} images/s)")
+    return rate
+
+
+def run_viewer() -> None:
+    root = tkinter.Tk()
+    root.title("Image Viewer")
+
+    file_path = filedialog.askopenfilename(filetypes=IMAGE_FILETYPES)
+    if file_path:
+        app = Canvas(file_path, root)
+        app.root.mainloop()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Grayscale, diff and histogram tools. Starts the viewer when no inputs are given.")
+    parser.add_argument("inputs", nargs="*", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="output", help="directory for the results")
+    parser.add_argument("-m", "--modes", nargs="+", choices=BATCH_MODES, default=list(BATCH_MODES))
+    parser.add_argument("-j", "--workers", type=int, default=None, help="process count (defaults to the number of cores)")
+    parser.add_argument("-t", "--tile-rows", type=int, default=None, help="process each image in strips of this many rows on worker threads")
+    parser.add_argument("-f", "--format", choices=("png", "pgm"), default="png", help="output format for tiled runs; pgm is written strip by strip")
+    args = parser.parse_args(argv)
+
+    if not args.inputs:
+        run_viewer()
+        return
+
+    paths = collect_images(args.inputs)
+    if not paths:
+        parser.error("no images matched the given inputs")
+    run_batch(paths, args.output, args.modes, args.workers, args.tile_rows, args.format)
+
 
-def show_histogram(image: Image.Image):
-    img = image.convert("RGB")
-    r, g, b = img.split()
-    r_hist = np.array(r).flatten()
-    g_hist = np.array(g).flatten()
-    b_hist = np.array(b).flatten()
-
-    plt.figure(figsize=(10, 5))
-    plt.hist(r_hist, bins=256, color='red', alpha=0.5, label='Red Channel')
-    plt.hist(g_hist, bins=256, color='green', alpha=0.5, label='Green Channel')
-    plt.hist(b_hist, bins=256, color='blue', alpha=0.5, label='Blue Channel')
-    plt.title('Color Histogram')
-    plt.xlabel('Pixel Intensity')
-    plt.ylabel('Frequency')
-    plt.legend()
-    plt.show()
-
-if file_path:
-    app = Canvas(file_path, root)
-    app.root.mainloop()
+if __name__ == "__main__":
+    main()
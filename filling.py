@@ -1,34 +1,89 @@
+import math
+import os
+import threading
+import time
 import tkinter
+import numpy as np
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 
 WIDTH = 300
 HEIGHT = 300
+RGB_INTERN_MAX = 4096
 
 class RGB:
-    def __init__(self, r: int, g: int, b: int) -> None:
+    # Immutable and interned: equal colors share one instance, packed as 0xRRGGBB.
+    # The intern table is emptied once it holds RGB_INTERN_MAX colors, so
+    # smooth gradients cannot pin every color they ever produced.
+    __slots__ = ("value",)
+    interned: dict[int, "RGB"] = {}
+
+    def __new__(cls, r: int, g: int, b: int) -> "RGB":
         if not (0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255):
             raise ValueError("RGB values must be in the range 0-255.")
-        
-        self.r = r
-        self.g = g
-        self.b = b
-    
+        # Packing would truncate fractional channels without a word.
+        if not (r == int(r) and g == int(g) and b == int(b)):
+            raise ValueError("RGB values must be whole numbers, got " + str((r, g, b)))
+
+        value = (int(r) << 16) | (int(g) << 8) | int(b)
+        color = cls.interned.get(value)
+        if color is None:
+            color = super().__new__(cls)
+            object.__setattr__(color, "value", value)
+            if len(cls.interned) >= RGB_INTERN_MAX:
+                cls.interned.clear()
+            cls.interned[value] = color
+        return color
+
+    def __reduce__(self) -> tuple[type["RGB"], tuple[int, int, int]]:
+        return RGB, (self.r, self.g, self.b)
+
+    @classmethod
+    def from_int(cls, value: int) -> "RGB":
+        return cls((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+
+    @property
+    def r(self) -> int:
+        return self.value >> 16
+
+    @property
+    def g(self) -> int:
+        return (self.value >> 8) & 0xFF
+
+    @property
+    def b(self) -> int:
+        return self.value & 0xFF
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable.")
+
     def __repr__(self) -> str:
         return f"RGB({self.r}, {self.g}, {self.b})"
     
     def __eq__(self, other) -> bool:
         if not isinstance(other, RGB):
             return False
-        return self.r == other.r and self.g == other.g and self.b == other.b
+        return self.value == other.value
     
     def __ne__(self, value: object) -> bool:
         return not self.__eq__(value)
 
+    def __hash__(self) -> int:
+        return hash(self.value)
+
 class Pixel:
-    def __init__(self, x: float, y: float, color: RGB = RGB(0, 0, 0)) -> None:
+    __slots__ = ("x", "y", "color")
+
+    def __init__(self, x: float, y: float, color: RGB | None = None) -> None:
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "color", color if color is not None else RGB(0, 0, 0))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable.")
 
-        self.x = x
-        self.y = y
-        self.color = color
+    def __reduce__(self) -> tuple[type["Pixel"], tuple[float, float, RGB]]:
+        return Pixel, (self.x, self.y, self.color)
     
     def __repr__(self) -> str:
         return f"Pixel({self.x}, {self.y}, color={self.color})"
@@ -40,22 +95,40 @@ class Pixel:
     
     def __ne__(self, value: object) -> bool:
         return not self.__eq__(value)
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
     
 class Canvas:
-    def __init__(self, width: int, height: int) -> None:
+    def __init__(self, width: int, height: int, framebuffer: bool = False) -> None:
         if width <= 0 or height <= 0:
             raise ValueError("Width and height must be positive values.")
         
         self.width = width
         self.height = height
         self.pixels: list[Pixel] = []
+        self.buffer: np.ndarray | None = None
+        self.mask: np.ndarray | None = None
+        self.depth: np.ndarray | None = None
+        self.dirty: tuple[int, int, int, int] | None = None
+        # Tiled fills mark their tiles from worker threads.
+        self.dirty_lock = threading.Lock()
+        if framebuffer:
+            self.buffer = np.zeros((height, width, 3), dtype=np.uint8)
+            self.mask = np.zeros((height, width), dtype=bool)
 
     def __repr__(self) -> str:
+        if self.mask is not None:
+            return f"Canvas({self.width}, {self.height}, framebuffer=True, pixels_count={int(self.mask.sum())})"
         return f"Canvas({self.width}, {self.height}, pixels_count={len(self.pixels)})"
     
     def __eq__(self, other) -> bool:
         if not isinstance(other, Canvas):
             return False
+        if self.buffer is not None or other.buffer is not None:
+            return (self.width == other.width and
+                    self.height == other.height and
+                    bool((self.to_array() == other.to_array()).all()))
         return (self.width == other.width and 
                 self.height == other.height and 
                 self.pixels == other.pixels)
@@ -67,12 +140,148 @@ class Canvas:
         if not isinstance(pixel, Pixel):
             raise TypeError("Only Pixel instances can be added to Canvas.")
         
+        if self.buffer is not None:
+            self.plot(pixel.x, pixel.y, pixel.color.r, pixel.color.g, pixel.color.b)
+            return self
+
         if not (0 <= pixel.x <= self.width and 0 <= pixel.y <= self.height):
             raise ValueError("Pixel coordinates must be within the canvas dimensions.")
         
         self.pixels.append(pixel)
+        self.mark_dirty(int(pixel.x), int(pixel.y), int(pixel.x) + 1, int(pixel.y) + 1)
         return self
+
+    def mark_dirty(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        # Grows the pending update rectangle; x1 and y1 are exclusive.
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        with self.dirty_lock:
+            if self.dirty is not None:
+                dx0, dy0, dx1, dy1 = self.dirty
+                x0, y0, x1, y1 = min(x0, dx0), min(y0, dy0), max(x1, dx1), max(y1, dy1)
+            self.dirty = (x0, y0, x1, y1)
+
+    def take_dirty(self) -> tuple[int, int, int, int] | None:
+        with self.dirty_lock:
+            dirty, self.dirty = self.dirty, None
+        return dirty
+
+    def plot(self, x: float, y: float, r: int, g: int, b: int) -> None:
+        if self.buffer is None or self.mask is None:
+            self += Pixel(x, y, RGB(r, g, b))
+            return
+
+        if not (0 <= x <= self.width and 0 <= y <= self.height):
+            raise ValueError("Pixel coordinates must be within the canvas dimensions.")
+        if not (0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255):
+            raise ValueError("RGB values must be in the range 0-255.")
+        if not (r == int(r) and g == int(g) and b == int(b)):
+            raise ValueError("RGB values must be whole numbers, got " + str((r, g, b)))
+
+        # The right and bottom borders are valid coordinates but have no cell
+        # in the framebuffer, so they are clipped.
+        col, row = int(x), int(y)
+        if col < self.width and row < self.height:
+            self.buffer[row, col] = (r, g, b)
+            self.mask[row, col] = True
+            self.mark_dirty(col, row, col + 1, row + 1)
+
+    def plot_many(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        if self.buffer is None or self.mask is None:
+            for x, y, (r, g, b) in zip(xs.tolist(), ys.tolist(), colors.tolist()):
+                self += Pixel(x, y, RGB(r, g, b))
+            return
+
+        if len(xs) and not (
+            xs.min() >= 0 and xs.max() <= self.width and ys.min() >= 0 and ys.max() <= self.height
+        ):
+            raise ValueError("Pixel coordinates must be within the canvas dimensions.")
+        if len(colors) and not (colors.min() >= 0 and colors.max() <= 255):
+            raise ValueError("RGB values must be in the range 0-255.")
+        if colors.dtype.kind == "f" and (colors != np.trunc(colors)).any():
+            raise ValueError("RGB values must be whole numbers.")
+
+        cols = xs.astype(np.intp)
+        rows = ys.astype(np.intp)
+        inside = (cols < self.width) & (rows < self.height)
+        cols, rows = cols[inside], rows[inside]
+        self.buffer[rows, cols] = colors[inside]
+        self.mask[rows, cols] = True
+        if len(cols):
+            self.mark_dirty(int(cols.min()), int(rows.min()), int(cols.max()) + 1, int(rows.max()) + 1)
+
+    def plot_mask(self, x0: int, y0: int, mask: np.ndarray, colors: np.ndarray) -> None:
+        # colors holds one row per set cell of mask, in row-major order.
+        if self.buffer is None or self.mask is None:
+            rows, cols = np.nonzero(mask)
+            # List mode keeps the column-by-column order of the original fill loop.
+            order = np.lexsort((rows, cols))
+            self.plot_many(cols[order] + x0, rows[order] + y0, colors[order])
+            return
+
+        height, width = mask.shape
+        if not (0 <= x0 and x0 + width <= self.width and 0 <= y0 and y0 + height <= self.height):
+            raise ValueError("Pixel coordinates must be within the canvas dimensions.")
+
+        region = (slice(y0, y0 + height), slice(x0, x0 + width))
+        self.buffer[region][mask] = colors
+        self.mask[region] |= mask
+        self.mark_dirty(x0, y0, x0 + width, y0 + height)
+
+    def depth_buffer(self) -> np.ndarray:
+        if self.depth is None:
+            self.depth = np.full((self.height, self.width), np.inf)
+        return self.depth
+
+    def to_array(
+        self,
+        background: tuple[int, int, int] = (255, 255, 255),
+        region: tuple[int, int, int, int] | None = None,
+    ) -> np.ndarray:
+        x0, y0, x1, y1 = region or (0, 0, self.width, self.height)
+        array = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        array[:] = background
+        if self.buffer is not None and self.mask is not None:
+            mask = self.mask[y0:y1, x0:x1]
+            array[mask] = self.buffer[y0:y1, x0:x1][mask]
+            return array
+
+        for pixel in self.pixels:
+            col, row = int(pixel.x), int(pixel.y)
+            if x0 <= col < x1 and y0 <= row < y1:
+                array[row - y0, col - x0] = (pixel.color.r, pixel.color.g, pixel.color.b)
+        return array
+
+    def to_image(self, background: tuple[int, int, int] = (255, 255, 255)) -> Image.Image:
+        return Image.fromarray(self.to_array(background), "RGB")
     
+def line_pixels(edges: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Integer DDA over (E, 4) rows of x1, y1, x2, y2: step t of an edge with
+    # n = max(|dx|, |dy|) steps lands on x1 + round(dx * t / n), rounded half
+    # away from zero with integer arithmetic only. Each edge is stepped from
+    # its lexicographically smaller endpoint, since the rounding favours the
+    # start; that way an edge and its reverse cover the same pixels. Returns
+    # the x and y arrays and the index of the edge each pixel belongs to.
+    edges = np.rint(np.asarray(edges, dtype=np.float64)).astype(np.int64).reshape(-1, 4)
+    reverse = (edges[:, 2] < edges[:, 0]) | ((edges[:, 2] == edges[:, 0]) & (edges[:, 3] < edges[:, 1]))
+    edges[reverse] = edges[reverse][:, [2, 3, 0, 1]]
+    x1, y1, x2, y2 = edges.T
+    dx = x2 - x1
+    dy = y2 - y1
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+
+    counts = steps + 1
+    edge_ids = np.repeat(np.arange(len(edges)), counts)
+    starts = np.cumsum(counts) - counts
+    t = np.arange(int(counts.sum())) - np.repeat(starts, counts)
+
+    n = np.maximum(steps, 1)[edge_ids]
+    xs = x1[edge_ids] + np.sign(dx)[edge_ids] * ((2 * np.abs(dx)[edge_ids] * t + n) // (2 * n))
+    ys = y1[edge_ids] + np.sign(dy)[edge_ids] * ((2 * np.abs(dy)[edge_ids] * t + n) // (2 * n))
+    return xs, ys, edge_ids
+
 def draw_triangle(canvas: Canvas, p1: Pixel, p2: Pixel, p3: Pixel) -> None:
     if not all(isinstance(p, Pixel) for p in [p1, p2, p3]):
         raise TypeError("All vertices must be pixel instances.")
@@ -81,64 +290,257 @@ def draw_triangle(canvas: Canvas, p1: Pixel, p2: Pixel, p3: Pixel) -> None:
         if not (0 <= p.x <= canvas.width and 0 <= p.y <= canvas.height):
             raise ValueError("Triangle vertices must be within the canvas dimensions.")
         
-        canvas += Pixel(p.x, p.y, p.color)
+        canvas.plot(p.x, p.y, p.color.r, p.color.g, p.color.b)
 
-    for i in range(3):
-        p_start = [p1, p2, p3][i]
-        p_end = [p1, p2, p3][(i + 1) % 3]
-        
-        x1, y1 = p_start.x, p_start.y
-        x2, y2 = p_end.x, p_end.y
-        
-        dx = x2 - x1
-        dy = y2 - y1
-        steps = int(max(abs(dx), abs(dy)))
-        
-        if steps == 0:
-            continue
-        
-        x_inc = dx / steps
-        y_inc = dy / steps
-        
-        x, y = x1, y1
-        for _ in range(steps + 1):
-            canvas += Pixel(round(x), round(y), p_start.color)
-            x += x_inc
-            y += y_inc
+    vertices = [p1, p2, p3]
+    edges = np.array([
+        [p.x, p.y, vertices[(i + 1) % 3].x, vertices[(i + 1) % 3].y]
+        for i, p in enumerate(vertices)
+    ])
+    edge_colors = np.array([[p.color.r, p.color.g, p.color.b] for p in vertices], dtype=np.uint8)
+
+    xs, ys, edge_ids = line_pixels(edges)
+    canvas.plot_many(xs, ys, edge_colors[edge_ids])
+
+def draw_wireframe(canvas: Canvas, positions: np.ndarray, colors: np.ndarray, indices: np.ndarray) -> None:
+    # Outlines every triangle of the mesh; edges shared by two triangles are
+    # drawn once, in the color of their first vertex. Pixels off the canvas are clipped.
+    positions = np.asarray(positions, dtype=np.float64)[:, :2]
+    colors = np.asarray(colors)
+    indices = np.asarray(indices, dtype=np.intp)
+    if colors.shape != (len(positions), 3):
+        raise ValueError("Vertex colors must have shape (N, 3).")
+    if indices.ndim != 2 or indices.shape[1] != 3:
+        raise ValueError("Index buffer must have shape (M, 3).")
+
+    pairs = np.concatenate([indices[:, [0, 1]], indices[:, [1, 2]], indices[:, [2, 0]]])
+    pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+
+    xs, ys, edge_ids = line_pixels(np.hstack([positions[pairs[:, 0]], positions[pairs[:, 1]]]))
+    visible = (xs >= 0) & (xs <= canvas.width) & (ys >= 0) & (ys <= canvas.height)
+    canvas.plot_many(xs[visible], ys[visible], colors[pairs[edge_ids[visible], 0]])
 
 def area(p1: Pixel, p2: Pixel, p3: Pixel) -> float:
     return ((p2.x - p1.x) * (p3.y - p1.y) - (p3.x - p1.x) * (p2.y - p1.y)) / 2.0
 
-def fill_triangle(canvas: Canvas, p1: Pixel, p2: Pixel, p3: Pixel) -> None:
+def edge_functions(
+    p1: Pixel, p2: Pixel, p3: Pixel, xs: np.ndarray, ys: np.ndarray
+) -> tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+    # Doubled areas from area() for every (x, y) of the grid: each edge is
+    # evaluated once per row and column and combined by broadcasting.
+    S = (p2.x - p1.x) * (p3.y - p1.y) - (p3.x - p1.x) * (p2.y - p1.y)
+    if S == 0:
+        raise ValueError("Triangle vertices must not be collinear.")
+
+    x = xs[np.newaxis, :]
+    y = ys[:, np.newaxis]
+    E1 = (p2.x - x) * (p3.y - y) - (p3.x - x) * (p2.y - y)
+    E2 = ((xs - p1.x) * (p3.y - p1.y))[np.newaxis, :] - ((p3.x - p1.x) * (ys - p1.y))[:, np.newaxis]
+    E3 = ((p2.x - p1.x) * (ys - p1.y))[:, np.newaxis] - ((xs - p1.x) * (p2.y - p1.y))[np.newaxis, :]
+    return S, E1, E2, E3
+
+def inside_mask(S: float, E1: np.ndarray, E2: np.ndarray, E3: np.ndarray) -> np.ndarray:
+    if S > 0:
+        return (E1 >= 0) & (E2 >= 0) & (E3 >= 0)
+    return (E1 <= 0) & (E2 <= 0) & (E3 <= 0)
+
+def shade(p1: Pixel, p2: Pixel, p3: Pixel, u: np.ndarray, v: np.ndarray, w: np.ndarray) -> np.ndarray:
+    colors = np.empty((len(u), 3), dtype=np.uint8)
+    colors[:, 0] = u * p1.color.r + v * p2.color.r + w * p3.color.r
+    colors[:, 1] = u * p1.color.g + v * p2.color.g + w * p3.color.g
+    colors[:, 2] = u * p1.color.b + v * p2.color.b + w * p3.color.b
+    return colors
+
+def fill_region(canvas: Canvas, p1: Pixel, p2: Pixel, p3: Pixel, xmin: int, xmax: int, ymin: int, ymax: int) -> None:
+    xs = np.arange(xmin, xmax + 1, dtype=np.float64)
+    ys = np.arange(ymin, ymax + 1, dtype=np.float64)
+    S, E1, E2, E3 = edge_functions(p1, p2, p3, xs, ys)
+    inside = inside_mask(S, E1, E2, E3)
+    if not inside.any():
+        return
+
+    # Dividing the doubled areas is exact against area() / area(), so the
+    # weights match the scalar formula bit for bit.
+    u, v, w = E1[inside] / S, E2[inside] / S, E3[inside] / S
+    canvas.plot_mask(xmin, ymin, inside, shade(p1, p2, p3, u, v, w))
+
+def tile_is_outside(p1: Pixel, p2: Pixel, p3: Pixel, xmin: int, xmax: int, ymin: int, ymax: int) -> bool:
+    # Edge functions are linear, so a tile whose four corners are all outside
+    # one edge cannot contain a covered pixel.
+    S, E1, E2, E3 = edge_functions(
+        p1, p2, p3,
+        np.array([xmin, xmax], dtype=np.float64),
+        np.array([ymin, ymax], dtype=np.float64),
+    )
+    sign = 1 if S > 0 else -1
+    return any(bool((sign * E < 0).all()) for E in (E1, E2, E3))
+
+def fill_triangle(
+    canvas: Canvas,
+    p1: Pixel,
+    p2: Pixel,
+    p3: Pixel,
+    tile_size: int | None = None,
+    workers: int | None = None,
+) -> None:
     if not all(0 <= px < canvas.width and 0 <= py < canvas.height for px, py in [(p1.x, p1.y), (p2.x, p2.y), (p3.x, p3.y)]):
         raise ValueError("Triangle vertices must be within the canvas dimensions.")
+    if tile_size is not None and tile_size <= 0:
+        raise ValueError("Tile size must be positive.")
     
-    xmin = min(p1.x, p2.x, p3.x)
-    ymin = min(p1.y, p2.y, p3.y)
-    xmax = max(p1.x, p2.x, p3.x)
-    ymax = max(p1.y, p2.y, p3.y)
-
-    S = area(p1, p2, p3)
-
-    for x in range(int(xmin), int(xmax) + 1):
-        for y in range(int(ymin), int(ymax) + 1):
-            p = Pixel(x, y)
-            S1 = area(p, p2, p3)
-            S2 = area(p1, p, p3)
-            S3 = area(p1, p2, p)
-            u = S1 / S
-            v = S2 / S
-            w = S3 / S
-            if u < 0 or v < 0 or w < 0:
-                continue
-
-            r = int(u * p1.color.r + v * p2.color.r + w * p3.color.r)
-            g = int(u * p1.color.g + v * p2.color.g + w * p3.color.g)
-            b = int(u * p1.color.b + v * p2.color.b + w * p3.color.b)
-            canvas += Pixel(x, y, RGB(r, g, b))
+    xmin = int(min(p1.x, p2.x, p3.x))
+    ymin = int(min(p1.y, p2.y, p3.y))
+    xmax = int(max(p1.x, p2.x, p3.x))
+    ymax = int(max(p1.y, p2.y, p3.y))
+
+    # List canvases depend on the serial pixel order, so only framebuffers are tiled.
+    if tile_size is None or canvas.buffer is None:
+        fill_region(canvas, p1, p2, p3, xmin, xmax, ymin, ymax)
+        return
+
+    if area(p1, p2, p3) == 0:
+        raise ValueError("Triangle vertices must not be collinear.")
+
+    tiles = [
+        (x0, min(x0 + tile_size - 1, xmax), y0, min(y0 + tile_size - 1, ymax))
+        for y0 in range(ymin, ymax + 1, tile_size)
+        for x0 in range(xmin, xmax + 1, tile_size)
+    ]
+    tiles = [tile for tile in tiles if not tile_is_outside(p1, p2, p3, *tile)]
+
+    # NumPy releases the GIL in the per-tile kernels, and tiles write disjoint
+    # regions of the shared framebuffer.
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for future in [executor.submit(fill_region, canvas, p1, p2, p3, *tile) for tile in tiles]:
+            future.result()
+
+def edge_function(
+    ax: float, ay: float, bx: float, by: float, xs: np.ndarray, ys: np.ndarray
+) -> np.ndarray:
+    return ((bx - ax) * (ys - ay))[:, np.newaxis] - ((by - ay) * (xs - ax))[np.newaxis, :]
+
+def is_top_left(ax: float, ay: float, bx: float, by: float) -> bool:
+    # With positive area the interior lies along (-dy, dx) from every edge:
+    # left edges go up the screen, top edges are horizontal and go right.
+    dx, dy = bx - ax, by - ay
+    return dy < 0 or (dy == 0 and dx > 0)
+
+def render_mesh(
+    canvas: Canvas,
+    positions: np.ndarray,
+    colors: np.ndarray,
+    indices: np.ndarray,
+    depth: bool = False,
+) -> float:
+    # positions is (N, 2), or (N, 3) with z when depth testing; colors is (N, 3)
+    # and indices is (M, 3). Returns the throughput in triangles per second.
+    if canvas.buffer is None:
+        raise ValueError("Mesh rendering requires a framebuffer canvas.")
+
+    positions = np.asarray(positions, dtype=np.float64)
+    colors = np.asarray(colors, dtype=np.float64)
+    indices = np.asarray(indices, dtype=np.intp)
+    if positions.ndim != 2 or positions.shape[1] not in (2, 3):
+        raise ValueError("Vertex positions must have shape (N, 2) or (N, 3).")
+    if depth and positions.shape[1] != 3:
+        raise ValueError("Depth testing requires (N, 3) vertex positions.")
+    if colors.shape != (len(positions), 3):
+        raise ValueError("Vertex colors must have shape (N, 3).")
+    if len(colors) and not (colors.min() >= 0 and colors.max() <= 255):
+        raise ValueError("RGB values must be in the range 0-255.")
+    if indices.ndim != 2 or indices.shape[1] != 3:
+        raise ValueError("Index buffer must have shape (M, 3).")
+    if len(indices) and not (indices.min() >= 0 and indices.max() < len(positions)):
+        raise ValueError("Index buffer refers to missing vertices.")
+
+    depth_buffer = canvas.depth_buffer() if depth else None
+    start = time.perf_counter()
+
+    # Per-triangle setup runs on plain Python numbers, which is much cheaper
+    # than indexing NumPy scalars thousands of times.
+    vertices = positions.tolist()
+    vertex_colors = colors.tolist()
+
+    for i0, i1, i2 in indices.tolist():
+        x0, y0 = vertices[i0][:2]
+        x1, y1 = vertices[i1][:2]
+        x2, y2 = vertices[i2][:2]
+        S = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+        if S == 0:
+            continue
+        if S < 0:
+            i1, i2 = i2, i1
+            x1, y1, x2, y2 = x2, y2, x1, y1
+            S = -S
+
+        xmin = max(math.ceil(min(x0, x1, x2)), 0)
+        ymin = max(math.ceil(min(y0, y1, y2)), 0)
+        xmax = min(math.floor(max(x0, x1, x2)), canvas.width - 1)
+        ymax = min(math.floor(max(y0, y1, y2)), canvas.height - 1)
+        if xmin > xmax or ymin > ymax:
+            continue
+
+        xs = np.arange(xmin, xmax + 1, dtype=np.float64)
+        ys = np.arange(ymin, ymax + 1, dtype=np.float64)
+        inside = np.ones((len(ys), len(xs)), dtype=bool)
+        weights = list[np.ndarray]()
+        # Weight of each vertex is the edge function of the opposite edge.
+        for (ax, ay), (bx, by) in (((x1, y1), (x2, y2)), ((x2, y2), (x0, y0)), ((x0, y0), (x1, y1))):
+            E = edge_function(ax, ay, bx, by, xs, ys)
+            inside &= (E >= 0) if is_top_left(ax, ay, bx, by) else (E > 0)
+            weights.append(E)
+
+        u, v, w = (E[inside] / S for E in weights)
+        if depth_buffer is not None:
+            z = u * vertices[i0][2] + v * vertices[i1][2] + w * vertices[i2][2]
+            region = depth_buffer[ymin:ymax + 1, xmin:xmax + 1]
+            closer = z < region[inside]
+            inside[inside] = closer
+            u, v, w, z = u[closer], v[closer], w[closer], z[closer]
+            region[inside] = z
+
+        c0, c1, c2 = vertex_colors[i0], vertex_colors[i1], vertex_colors[i2]
+        shaded = np.empty((len(u), 3), dtype=np.uint8)
+        for channel in range(3):
+            shaded[:, channel] = u * c0[channel] + v * c1[channel] + w * c2[channel]
+        canvas.plot_mask(xmin, ymin, inside, shaded)
+
+    elapsed = time.perf_counter() - start
+    return len(indices) / elapsed if elapsed > 0 else float("inf")
+
+def ppm_bytes(array: np.ndarray) -> bytes:
+    height, width = array.shape[:2]
+    return f"P6\n{width} {height}\n255\n".encode("ascii") + np.ascontiguousarray(array, dtype=np.uint8).tobytes()
+
+class CanvasView:
+    # Shows a Canvas as one PhotoImage item; refresh() re-uploads only the
+    # rectangle written since the previous call.
+    def __init__(
+        self,
+        tk_canvas: tkinter.Canvas,
+        canvas: Canvas,
+        background: tuple[int, int, int] = (255, 255, 255),
+    ) -> None:
+        self.tk_canvas = tk_canvas
+        self.canvas = canvas
+        self.background = background
+        self.photo = tkinter.PhotoImage(master=tk_canvas, width=canvas.width, height=canvas.height)
+        self.item = tk_canvas.create_image(0, 0, anchor="nw", image=self.photo)
+
+        canvas.mark_dirty(0, 0, canvas.width, canvas.height)
+        self.refresh()
+
+    def refresh(self) -> None:
+        region = self.canvas.take_dirty()
+        if region is None:
+            return
+
+        x0, y0, _, _ = region
+        data = ppm_bytes(self.canvas.to_array(self.background, region))
+        self.photo.tk.call(self.photo.name, "put", data, "-format", "ppm", "-to", x0, y0)
 
 if __name__ == "__main__":
-    canvas = Canvas(WIDTH, HEIGHT)
+    canvas = Canvas(WIDTH, HEIGHT, framebuffer=True)
     p1 = Pixel(50, 50, RGB(255, 0, 0))
     p2 = Pixel(250, 5, RGB(0, 255, 0))
     p3 = Pixel(150, 250, RGB(0, 0, 255))
@@ -147,19 +549,10 @@ if __name__ == "__main__":
     root = tkinter.Tk()
     canvas_widget = tkinter.Canvas(root, width=WIDTH, height=HEIGHT, bg="white")
     canvas_widget.pack()
+    view = CanvasView(canvas_widget, canvas)
 
     fill_triangle(canvas, p1, p2, p3)
-
-    for pixel in canvas.pixels:
-        r = 1
-        x = pixel.x
-        y = pixel.y
-        color = f"#{pixel.color.r:02x}{pixel.color.g:02x}{pixel.color.b:02x}"
-        canvas_widget.create_oval(
-            x - r, y - r,
-            x + r, y + r,
-            fill=color, outline=""
-        )
+    view.refresh()
 
     print(canvas)
     
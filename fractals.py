@@ -33,32 +33,7 @@ class TkinterCanvas(BaseCanvas):
         if np.linalg.det(matrix) == 0:
             raise ValueError("Transformation matrix must be invertible (non-singular).")
 
-        self.points.clear()
-        self.grid_matrix = np.zeros((self.height, self.width), dtype=bool)
-
-        for i in range(len(self.lines)):
-            line = self.lines[i]
-            start_vec = np.array([line.start.x, line.start.y, 1])
-            end_vec = np.array([line.end.x, line.end.y, 1])
-            new_start_vec = matrix @ start_vec
-            new_end_vec = matrix @ end_vec
-
-            x0, y0 = int(new_start_vec[0]), int(new_start_vec[1])
-            x1, y1 = int(new_end_vec[0]), int(new_end_vec[1])
-
-            point1 = Point(x0, y0)
-            point2 = Point(x1, y1)
-            line.start = point1
-            line.end = point2
-
-            self.lines[i] = line
-            self += point1
-            self += point2
-
-            if 0 <= x0 < self.width and 0 <= y0 < self.height:
-                self.grid_matrix[y0, x0] = True
-            if 0 <= x1 < self.width and 0 <= y1 < self.height:
-                self.grid_matrix[y1, x1] = True
+        self.transform_lines(matrix)
 
 
 class Fractal:
@@ -1,4 +1,7 @@
+import bisect
+import weakref
 import numpy as np
+from collections.abc import Iterable, Iterator, MutableSequence
 from typing import Union, Any
 
 Shape = Union["PointType", "LineType"]
@@ -36,7 +39,7 @@ class BasePoint:
 class Point(BasePoint):
     def __init__(self, x: Number, y: Number) -> None:
         super().__init__(x, y)
-        self.__features = dict[str, Any]()
+        self.__features: dict[str, Any] = {}
 
     def __getitem__(self, item: str) -> Any:
         return self.__features.get(item, None)
@@ -44,6 +47,9 @@ class Point(BasePoint):
     def __setitem__(self, key: str, value: Any) -> None:
         self.__features[key] = value
 
+    def features(self) -> dict[str, Any]:
+        return self.__features
+
     def __repr__(self) -> str:
         features = ", ".join(f"{k}={repr(v)}" for k, v in self.__features.items())
         if features:
@@ -78,7 +84,7 @@ class BaseLine:
 class Line(BaseLine):
     def __init__(self, start: PointType, end: PointType) -> None:
         super().__init__(start, end)
-        self.__features = dict[str, Any]()
+        self.__features: dict[str, Any] = {}
 
     def __getitem__(self, item: str) -> Any:
         return self.__features.get(item, None)
@@ -86,6 +92,9 @@ class Line(BaseLine):
     def __setitem__(self, key: str, value: Any) -> None:
         self.__features[key] = value
 
+    def features(self) -> dict[str, Any]:
+        return self.__features
+
     def __repr__(self) -> str:
         features = ", ".join(f"{k}={repr(v)}" for k, v in self.__features.items())
         if features:
@@ -93,16 +102,864 @@ class Line(BaseLine):
         return f"{self.__class__.__name__}({self.start}, {self.end})"
 
 
-class BaseCanvas:
+def affine_transform(matrix: np.ndarray, coordinates: np.ndarray) -> np.ndarray:
+    # Applies a 3x3 affine matrix to (N, 2) coordinates as a single
+    # (N, 3) @ M.T product.
+    homogeneous = np.empty((len(coordinates), 3), dtype=np.float64)
+    homogeneous[:, :2] = coordinates
+    homogeneous[:, 2] = 1.0
+    return (homogeneous @ matrix.T)[:, :2]
+
+
+class TransformStack:
+    # Affine matrices applied since the source geometry was captured, each
+    # composed with the ones before it. Undone matrices wait in a redo list
+    # until a new transform is pushed.
+    def __init__(self) -> None:
+        self.source: tuple[PointStore, Occupancy] | None = None
+        self.history = list[np.ndarray]()
+        self.undone = list[np.ndarray]()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.history[-1] if self.history else np.eye(3)
+
+    def push(self, matrix: np.ndarray) -> None:
+        self.history.append(np.asarray(matrix, dtype=np.float64) @ self.matrix)
+        self.undone.clear()
+
+    def undo(self) -> bool:
+        if not self.history:
+            return False
+        self.undone.append(self.history.pop())
+        return True
+
+    def redo(self) -> bool:
+        if not self.undone:
+            return False
+        self.history.append(self.undone.pop())
+        return True
+
+    def clear(self) -> None:
+        self.source = None
+        self.history.clear()
+        self.undone.clear()
+
+
+def shape_features(shape: Shape) -> dict[str, Any]:
+    return shape.features() if isinstance(shape, (Point, Line)) else {}
+
+
+class FeatureColumns:
+    # Sparse per-row features: one object column per feature name, created the
+    # first time a row sets it and None for rows that never did.
+    def __init__(self) -> None:
+        self.columns: dict[str, np.ndarray] = {}
+
+    def get(self, key: str, row: int) -> Any:
+        column = self.columns.get(key)
+        return None if column is None else column[row]
+
+    def set(self, key: str, row: int, value: Any, capacity: int) -> None:
+        if key not in self.columns:
+            self.columns[key] = np.full(capacity, None, dtype=object)
+        self.columns[key][row] = value
+
+    def row(self, row: int) -> dict[str, Any]:
+        return {key: column[row] for key, column in self.columns.items() if column[row] is not None}
+
+    def write(self, row: int, features: dict[str, Any], capacity: int) -> None:
+        for column in self.columns.values():
+            column[row] = None
+        for key, value in features.items():
+            self.set(key, row, value, capacity)
+
+    def grow(self, size: int, capacity: int) -> None:
+        for key, column in self.columns.items():
+            grown = np.full(capacity, None, dtype=object)
+            grown[:size] = column[:size]
+            self.columns[key] = grown
+
+    def keep(self, rows: np.ndarray, size: int) -> None:
+        # Moves rows[k] to row k and clears the rows left over up to size.
+        for column in self.columns.values():
+            column[:len(rows)] = column[rows]
+            column[len(rows):size] = None
+
+
+class RowStore(MutableSequence):
+    # Rows addressed through stable ids, so views survive deletions that shift
+    # the rows after them. Subclasses keep the actual columns and implement
+    # the column hooks at the bottom. Single deletions only mark their row
+    # dead; rows index the columns, dead ones included, while positions are
+    # what callers see, and settle() compacts the dead rows away.
+    def __init__(self, capacity: int) -> None:
+        capacity = max(capacity, 1)
+        self.size = 0
+        self.ids = np.empty(capacity, dtype=np.int32)
+        self.row_of = np.empty(capacity, dtype=np.int32)
+        self.next_id = 0
+        self.features = FeatureColumns()
+        # Weak references to the views handed out, by id. References to dead
+        # views are swept once the table doubles, which is cheaper than the
+        # per-view callbacks of a WeakValueDictionary.
+        self.views: dict[int, weakref.ref] = {}
+        self.views_limit = 64
+        self.dead: list[int] = []
+
+    @property
+    def capacity(self) -> int:
+        return len(self.ids)
+
+    def reserve(self, count: int) -> None:
+        if self.size + count > self.capacity:
+            capacity = max(self.size + count, 2 * self.capacity)
+            ids = np.empty(capacity, dtype=np.int32)
+            ids[:self.size] = self.ids[:self.size]
+            self.ids = ids
+            self.grow_columns(capacity)
+            self.features.grow(self.size, capacity)
+        if self.next_id + count > len(self.row_of):
+            self.renumber(count)
+
+    def renumber(self, count: int) -> None:
+        # Ids of deleted rows are reclaimed once they are the majority, by
+        # handing every row its position as the new id.
+        if self.next_id > 2 * self.size:
+            views = [ref() for ref in self.views.values()]
+            self.views = {}
+            for view in views:
+                if view is not None:
+                    view.ident = int(self.row_of[view.ident])
+                    self.views[view.ident] = weakref.ref(view)
+            self.ids[:self.size] = np.arange(self.size)
+            self.row_of[:self.size] = np.arange(self.size)
+            self.next_id = self.size
+        if self.next_id + count > len(self.row_of):
+            row_of = np.empty(max(self.next_id + count, 2 * len(self.row_of)), dtype=np.int32)
+            row_of[:self.next_id] = self.row_of[:self.next_id]
+            self.row_of = row_of
+
+    def add_rows(self, count: int) -> int:
+        # Appends rows with fresh ids and returns the first; columns are the
+        # caller's to fill.
+        self.reserve(count)
+        first = self.size
+        if count == 1:
+            self.ids[first] = self.next_id
+            self.row_of[self.next_id] = first
+        else:
+            self.ids[first:first + count] = np.arange(self.next_id, self.next_id + count)
+            self.row_of[self.next_id:self.next_id + count] = np.arange(first, first + count)
+        self.next_id += count
+        self.size += count
+        return first
+
+    def view(self, row: int) -> Any:
+        ident = self.ids.item(row)
+        view = self.live_view(ident)
+        if view is None:
+            view = self.make_view(ident)
+            self.keep_view(view)
+        return view
+
+    def live_view(self, ident: int) -> Any:
+        ref = self.views.get(ident)
+        return None if ref is None else ref()
+
+    def keep_view(self, view: Any) -> None:
+        self.views[view.ident] = weakref.ref(view)
+        if len(self.views) > self.views_limit:
+            self.views = {ident: ref for ident, ref in self.views.items() if ref() is not None}
+            self.views_limit = 2 * len(self.views) + 64
+
+    def drop_view(self, ident: int) -> Any:
+        ref = self.views.pop(ident, None)
+        return None if ref is None else ref()
+
+    def position(self, index: int) -> int:
+        # The row holding the item at index.
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(self.__class__.__name__ + " index out of range")
+        if self.dead:
+            dead = np.array(self.dead)
+            index += int(np.searchsorted(dead - np.arange(len(dead)), index, side="right"))
+        return index
+
+    def __len__(self) -> int:
+        return self.size - len(self.dead)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            self.settle()
+            return [self.view(row) for row in range(*index.indices(self.size))]
+        return self.view(self.position(index))
+
+    def __delitem__(self, index: int | slice) -> None:
+        if isinstance(index, slice):
+            self.settle()
+            self.delete_rows(np.arange(self.size)[index])
+        else:
+            self.delete_row(self.position(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        # Yields the same live views as indexing, in both stores, so edits made
+        # while iterating write through to the rows.
+        self.settle()
+        for row in range(self.size):
+            yield self.view(row)
+
+    def insert(self, index: int, item: Any) -> None:
+        self.settle()
+        index = min(max(index + self.size if index < 0 else index, 0), self.size)
+        self.append(item)
+        self.reorder(np.concatenate([np.arange(index), [self.size - 1], np.arange(index, self.size - 1)]))
+
+    def clear(self) -> None:
+        self.delete_rows(np.arange(self.size))
+
+    def delete_row(self, row: int) -> None:
+        # Marks one row dead instead of shifting every row after it. Dead rows
+        # are compacted together once they pass a 64th of the store, or before
+        # anything that reads the rows in bulk.
+        ident = int(self.ids[row])
+        view = self.drop_view(ident)
+        if view is not None:
+            view.detach()
+        self.row_of[ident] = -1
+        bisect.insort(self.dead, row)
+        if len(self.dead) > 64 + self.size // 64:
+            self.settle()
+
+    def is_dead(self, row: int) -> bool:
+        i = bisect.bisect_left(self.dead, row)
+        return i < len(self.dead) and self.dead[i] == row
+
+    def settle(self) -> None:
+        if self.dead:
+            keep = np.ones(self.size, dtype=bool)
+            keep[self.dead] = False
+            self.dead = []
+            self.reorder(np.flatnonzero(keep))
+
+    def delete_rows(self, rows: np.ndarray) -> None:
+        self.settle()
+        keep = np.ones(self.size, dtype=bool)
+        keep[np.asarray(rows, dtype=np.intp)] = False
+        if not keep.all():
+            self.keep_rows(np.flatnonzero(keep))
+
+    def keep_rows(self, kept: np.ndarray) -> np.ndarray:
+        # Compacts the store to the given rows, in order, and returns the new
+        # row of every old one (-1 for dropped rows). Views of dropped rows are
+        # detached with their current values; all other views follow their ids.
+        self.settle()
+        remap = np.full(self.size, -1, dtype=np.intp)
+        remap[kept] = np.arange(len(kept))
+        for ident in self.ids[:self.size][remap < 0].tolist():
+            view = self.drop_view(ident)
+            if view is not None:
+                view.detach()
+            self.row_of[ident] = -1
+
+        self.reorder(kept)
+        return remap
+
+    def reorder(self, order: np.ndarray) -> None:
+        # Moves rows order[k] to row k and truncates to len(order).
+        self.ids[:len(order)] = self.ids[order]
+        self.move_columns(order)
+        self.features.keep(order, self.size)
+        self.size = len(order)
+        self.row_of[self.ids[:self.size]] = np.arange(self.size)
+
+    def make_view(self, ident: int) -> Any:
+        raise NotImplementedError
+
+    def grow_columns(self, capacity: int) -> None:
+        raise NotImplementedError
+
+    def move_columns(self, order: np.ndarray) -> None:
+        raise NotImplementedError
+
+
+class PointView(Point):
+    # A row of a PointStore seen as a Point. Reads and writes go straight to
+    # the store's columns.
+    __slots__ = ("store", "ident")
+
+    def __init__(self, store: "PointStore", ident: int) -> None:
+        self.store = store
+        self.ident = ident
+
+    @property
+    def row(self) -> int:
+        return int(self.store.row_of[self.ident])
+
+    @property
+    def x(self) -> float:
+        return self.store.data.item(0, self.store.row_of.item(self.ident))
+
+    @x.setter
+    def x(self, value: Number) -> None:
+        self.store.data[0, self.store.row_of[self.ident]] = value
+
+    @property
+    def y(self) -> float:
+        return self.store.data.item(1, self.store.row_of.item(self.ident))
+
+    @y.setter
+    def y(self, value: Number) -> None:
+        self.store.data[1, self.store.row_of[self.ident]] = value
+
+    def __getitem__(self, item: str) -> Any:
+        return self.store.features.get(item, self.row)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.store.features.set(key, self.row, value, self.store.capacity)
+
+    def features(self) -> dict[str, Any]:
+        return self.store.features.row(self.row)
+
+    def __repr__(self) -> str:
+        features = ", ".join(f"{k}={repr(v)}" for k, v in self.features().items())
+        if features:
+            return f"Point({self.x}, {self.y}, {features})"
+        return f"Point({self.x}, {self.y})"
+
+    def detach(self) -> None:
+        # Keeps the current values in a store of its own before the row is
+        # deleted from the shared one.
+        store = PointStore([self])
+        self.store, self.ident = store, 0
+        store.keep_view(self)
+
+
+class PointStore(RowStore):
+    # Points as one (2, capacity) float64 block, x in the first row and y in
+    # the second, plus feature columns. Indexing and iteration yield
+    # PointViews, so callers that expect a list of Points keep working without
+    # copies.
+    def __init__(self, points: Iterable[PointType] = (), capacity: int = 16) -> None:
+        super().__init__(capacity)
+        self.data = np.empty((2, self.capacity), dtype=np.float64)
+        self.extend(points)
+
+    @classmethod
+    def from_arrays(cls, x: np.ndarray, y: np.ndarray) -> "PointStore":
+        store = cls(capacity=len(x))
+        first = store.add_rows(len(x))
+        store.data[0, first:store.size] = x
+        store.data[1, first:store.size] = y
+        return store
+
+    @property
+    def x(self) -> np.ndarray:
+        self.settle()
+        return self.data[0, :self.size]
+
+    @property
+    def y(self) -> np.ndarray:
+        self.settle()
+        return self.data[1, :self.size]
+
+    def coordinates(self) -> np.ndarray:
+        self.settle()
+        return self.data[:, :self.size].T
+
+    def make_view(self, ident: int) -> PointView:
+        return PointView(self, ident)
+
+    def grow_columns(self, capacity: int) -> None:
+        data = np.empty((2, capacity), dtype=np.float64)
+        data[:, :self.size] = self.data[:, :self.size]
+        self.data = data
+
+    def move_columns(self, order: np.ndarray) -> None:
+        self.data[:, :len(order)] = self.data[:, order]
+
+    def __setitem__(self, index: int, point: PointType) -> None:
+        row = self.position(index)
+        if isinstance(point, PointView) and point.store is self and point.row == row:
+            return
+        features = shape_features(point)
+        self.data[:, row] = point.x, point.y
+        self.features.write(row, features, self.capacity)
+
+    def __contains__(self, point: object) -> bool:
+        return self.find(point) >= 0
+
+    def find(self, point: object) -> int:
+        # The first live row equal to point, or -1. Rows are compared in
+        # doubling chunks, so points near the front are found early.
+        if not isinstance(point, BasePoint):
+            return -1
+        x, y = point.x, point.y
+        start, chunk = 0, 1024
+        while start < self.size:
+            stop = min(start + chunk, self.size)
+            rows = np.flatnonzero((self.data[0, start:stop] == x) & (self.data[1, start:stop] == y))
+            for row in (rows + start).tolist():
+                if not self.is_dead(row):
+                    return row
+            start, chunk = stop, 2 * chunk
+        return -1
+
+    def index(self, point: object, start: int = 0, stop: int | None = None) -> int:
+        if start != 0 or stop is not None:
+            return super().index(point, start, stop)
+        row = self.find(point)
+        if row < 0:
+            raise ValueError(f"{point} is not in the store")
+        return row - bisect.bisect_left(self.dead, row)
+
+    def append(self, point: PointType) -> None:
+        x, y = point.x, point.y
+        features = shape_features(point)
+        row = self.add_rows(1)
+        self.data[0, row] = x
+        self.data[1, row] = y
+        if features or self.features.columns:
+            self.features.write(row, features, self.capacity)
+
+    def extend(self, points: Iterable[PointType]) -> None:
+        if isinstance(points, PointStore):
+            points.settle()
+            count = len(points)
+            first = self.add_rows(count)
+            self.data[:, first:first + count] = points.data[:, :count]
+            for key, column in points.features.columns.items():
+                for offset in np.flatnonzero(column[:count] != None).tolist():
+                    self.features.set(key, first + offset, column[offset], self.capacity)
+            return
+        for point in points:
+            self.append(point)
+
+    def remove(self, point: object) -> None:
+        row = self.find(point)
+        if row < 0:
+            raise ValueError(f"{point} is not in the store")
+        self.delete_row(row)
+
+
+class LineView(Line):
+    # A row of a LineStore seen as a Line. Its endpoints are PointViews into
+    # the store's vertices, and assigning one re-points the row.
+    __slots__ = ("store", "ident")
+
+    def __init__(self, store: "LineStore", ident: int) -> None:
+        self.store = store
+        self.ident = ident
+
+    @property
+    def row(self) -> int:
+        return int(self.store.row_of[self.ident])
+
+    @property
+    def start(self) -> PointView:
+        return self.store.vertices.view(int(self.store.ends[self.row, 0]))
+
+    @start.setter
+    def start(self, point: PointType) -> None:
+        self.store.set_end(self.row, 0, point)
+
+    @property
+    def end(self) -> PointView:
+        return self.store.vertices.view(int(self.store.ends[self.row, 1]))
+
+    @end.setter
+    def end(self, point: PointType) -> None:
+        self.store.set_end(self.row, 1, point)
+
+    def __getitem__(self, item: str) -> Any:
+        return self.store.features.get(item, self.row)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.store.features.set(key, self.row, value, self.store.capacity)
+
+    def features(self) -> dict[str, Any]:
+        return self.store.features.row(self.row)
+
+    def __repr__(self) -> str:
+        features = ", ".join(f"{k}={repr(v)}" for k, v in self.features().items())
+        if features:
+            return f"Line({self.start}, {self.end}, {features})"
+        return f"Line({self.start}, {self.end})"
+
+    def detach(self) -> None:
+        store = LineStore([self])
+        self.store, self.ident = store, 0
+        store.keep_view(self)
+
+
+class LineStore(RowStore):
+    # Lines as (capacity, 2) index pairs into a PointStore of endpoints, plus
+    # feature columns. Endpoints that are already views of that store are
+    # shared by index instead of copied.
+    def __init__(self, lines: Iterable[LineType] = (), capacity: int = 16) -> None:
+        super().__init__(capacity)
+        self.vertices = PointStore(capacity=2 * self.capacity)
+        self.ends = np.empty((self.capacity, 2), dtype=np.intp)
+        self.extend(lines)
+
+    def set_segments(self, segments: np.ndarray) -> None:
+        # Gives every line two fresh endpoints at the given (N, 4) coordinates.
+        # Views of the old endpoints keep their old values.
+        self.settle()
+        corners = segments.reshape(-1, 2)
+        self.vertices = PointStore.from_arrays(corners[:, 0], corners[:, 1])
+        self.ends[:self.size] = np.arange(2 * self.size).reshape(-1, 2)
+
+    def segments(self, rows: np.ndarray | None = None) -> np.ndarray:
+        # (N, 4) rows of x1, y1, x2, y2, for all lines or the given rows.
+        self.settle()
+        ends = self.ends[:self.size] if rows is None else self.ends[rows]
+        x, y = self.vertices.x, self.vertices.y
+        start, end = ends[:, 0], ends[:, 1]
+        return np.stack([x[start], y[start], x[end], y[end]], axis=1)
+
+    def make_view(self, ident: int) -> LineView:
+        return LineView(self, ident)
+
+    def grow_columns(self, capacity: int) -> None:
+        ends = np.empty((capacity, 2), dtype=np.intp)
+        ends[:self.size] = self.ends[:self.size]
+        self.ends = ends
+
+    def move_columns(self, order: np.ndarray) -> None:
+        self.ends[:len(order)] = self.ends[order]
+
+    def vertex(self, point: PointType) -> int:
+        if isinstance(point, PointView) and point.store is self.vertices:
+            return point.row
+        self.vertices.append(point)
+        return len(self.vertices) - 1
+
+    def set_end(self, row: int, side: int, point: PointType) -> None:
+        self.ends[row, side] = self.vertex(point)
+        self.collect_vertices()
+
+    def collect_vertices(self) -> None:
+        # Endpoints replaced or left behind by deleted lines stay in the vertex
+        # store until they outnumber the referenced ones.
+        if len(self.vertices) <= 4 * self.size + 64:
+            return
+        self.settle()
+        used = np.unique(self.ends[:self.size])
+        remap = self.vertices.keep_rows(used)
+        self.ends[:self.size] = remap[self.ends[:self.size]]
+
+    def __setitem__(self, index: int, line: LineType) -> None:
+        row = self.position(index)
+        if isinstance(line, LineView) and line.store is self and line.row == row:
+            return
+        features = shape_features(line)
+        self.ends[row] = self.vertex(line.start), self.vertex(line.end)
+        self.features.write(row, features, self.capacity)
+        self.collect_vertices()
+
+    def append(self, line: LineType) -> None:
+        features = shape_features(line)
+        start, end = self.vertex(line.start), self.vertex(line.end)
+        row = self.add_rows(1)
+        self.ends[row] = start, end
+        if features or self.features.columns:
+            self.features.write(row, features, self.capacity)
+
+    def keep_rows(self, kept: np.ndarray) -> np.ndarray:
+        remap = super().keep_rows(kept)
+        self.collect_vertices()
+        return remap
+
+
+DENSE_OCCUPANCY_MAX_CELLS = 2**24
+OCCUPANCY_TILE = 64
+
+
+class Occupancy:
+    # Which cells of a width x height canvas hold a point. Cells are addressed
+    # by flat row-major index, y * width + x.
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_cells(cls, width: int, height: int, cells: np.ndarray) -> "Occupancy":
+        occupancy = cls(width, height)
+        occupancy.fill(cells)
+        return occupancy
+
+    def crowded(self) -> bool:
+        # Whether a bitset would now take less memory.
+        return False
+
+    def get(self, x: int, y: int) -> bool:
+        raise NotImplementedError
+
+    def set(self, x: int, y: int, value: bool) -> None:
+        raise NotImplementedError
+
+    def fill(self, cells: np.ndarray, value: bool = True) -> None:
+        raise NotImplementedError
+
+    def cells(self) -> np.ndarray:
+        # Occupied cells in ascending order.
+        return self.region_cells(0, 0, self.width, self.height)
+
+    def region_cells(self, left: int, top: int, right: int, bottom: int) -> np.ndarray:
+        # Occupied cells of the half-open box [left, right) x [top, bottom),
+        # in ascending order. The box must lie inside the canvas.
+        raise NotImplementedError
+
+    def to_dense(self) -> np.ndarray:
+        raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        raise NotImplementedError
+
+
+class DenseOccupancy(Occupancy):
+    # One bool per cell; the fastest, and what small canvases use.
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.grid = np.zeros((height, width), dtype=bool)
+
+    def get(self, x: int, y: int) -> bool:
+        return bool(self.grid[y, x])
+
+    def set(self, x: int, y: int, value: bool) -> None:
+        self.grid[y, x] = value
+
+    def fill(self, cells: np.ndarray, value: bool = True) -> None:
+        self.grid.flat[cells] = value
+
+    def cells(self) -> np.ndarray:
+        return np.flatnonzero(self.grid)
+
+    def region_cells(self, left: int, top: int, right: int, bottom: int) -> np.ndarray:
+        y, x = np.nonzero(self.grid[top:bottom, left:right])
+        return (y + top) * self.width + x + left
+
+    def to_dense(self) -> np.ndarray:
+        return self.grid
+
+    @property
+    def nbytes(self) -> int:
+        return self.grid.nbytes
+
+
+class BitsetOccupancy(Occupancy):
+    # One bit per cell, rows packed as by np.packbits: bit 7 of byte k holds
+    # x = 8 * k.
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.row_bytes = (width + 7) // 8
+        self.bits = np.zeros((height, self.row_bytes), dtype=np.uint8)
+
+    def get(self, x: int, y: int) -> bool:
+        return bool(self.bits[y, x >> 3] >> (7 - (x & 7)) & 1)
+
+    def set(self, x: int, y: int, value: bool) -> None:
+        if value:
+            self.bits[y, x >> 3] |= 0x80 >> (x & 7)
+        else:
+            self.bits[y, x >> 3] &= ~(0x80 >> (x & 7)) & 0xFF
+
+    def fill(self, cells: np.ndarray, value: bool = True) -> None:
+        y, x = np.divmod(np.asarray(cells, dtype=np.intp), self.width)
+        index = y * self.row_bytes + (x >> 3)
+        masks = (0x80 >> (x & 7)).astype(np.uint8)
+        if value:
+            np.bitwise_or.at(self.bits.reshape(-1), index, masks)
+        else:
+            np.bitwise_and.at(self.bits.reshape(-1), index, ~masks)
+
+    def cells(self) -> np.ndarray:
+        # Unpacks a band of rows at a time so the dense grid never exists whole.
+        band = max(1, DENSE_OCCUPANCY_MAX_CELLS // self.width)
+        found = [self.region_cells(0, top, self.width, min(top + band, self.height)) for top in range(0, self.height, band)]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def region_cells(self, left: int, top: int, right: int, bottom: int) -> np.ndarray:
+        # Unpacks only the bytes covering [left, right).
+        first = left >> 3
+        rows = np.unpackbits(self.bits[top:bottom, first:(right + 7) >> 3], axis=1)
+        y, x = np.nonzero(rows[:, left - 8 * first:right - 8 * first])
+        return (y + top) * self.width + x + left
+
+    def to_dense(self) -> np.ndarray:
+        return np.unpackbits(self.bits, axis=1, count=self.width).astype(bool)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+class TileOccupancy(Occupancy):
+    # Square bool tiles in a dict keyed by tile index, allocated on the first
+    # point that falls in them and dropped once cleared.
     def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.tiles_x = (width + OCCUPANCY_TILE - 1) // OCCUPANCY_TILE
+        self.tiles = dict[int, np.ndarray]()
+
+    def locate(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Tile key and flat offset inside the tile for each cell.
+        keys = (y // OCCUPANCY_TILE) * self.tiles_x + x // OCCUPANCY_TILE
+        return keys, (y % OCCUPANCY_TILE) * OCCUPANCY_TILE + x % OCCUPANCY_TILE
+
+    def crowded(self) -> bool:
+        return len(self.tiles) * OCCUPANCY_TILE**2 > self.height * ((self.width + 7) // 8)
+
+    def get(self, x: int, y: int) -> bool:
+        tile = self.tiles.get((y // OCCUPANCY_TILE) * self.tiles_x + x // OCCUPANCY_TILE)
+        return tile is not None and bool(tile[y % OCCUPANCY_TILE, x % OCCUPANCY_TILE])
+
+    def set(self, x: int, y: int, value: bool) -> None:
+        key = (y // OCCUPANCY_TILE) * self.tiles_x + x // OCCUPANCY_TILE
+        tile = self.tiles.get(key)
+        if tile is None:
+            if not value:
+                return
+            tile = self.tiles[key] = np.zeros((OCCUPANCY_TILE, OCCUPANCY_TILE), dtype=bool)
+        tile[y % OCCUPANCY_TILE, x % OCCUPANCY_TILE] = value
+        if not value and not tile.any():
+            del self.tiles[key]
+
+    def fill(self, cells: np.ndarray, value: bool = True) -> None:
+        y, x = np.divmod(np.asarray(cells, dtype=np.intp), self.width)
+        keys, offsets = self.locate(x, y)
+        order = np.argsort(keys, kind="stable")
+        keys, offsets = keys[order], offsets[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        for start, stop in zip(starts.tolist(), np.append(starts[1:], len(keys)).tolist()):
+            key = int(keys[start])
+            tile = self.tiles.get(key)
+            if tile is None:
+                if not value:
+                    continue
+                tile = self.tiles[key] = np.zeros((OCCUPANCY_TILE, OCCUPANCY_TILE), dtype=bool)
+            tile.flat[offsets[start:stop]] = value
+            if not value and not tile.any():
+                del self.tiles[key]
+
+    def cells(self) -> np.ndarray:
+        if not self.tiles:
+            return np.empty(0, dtype=np.intp)
+        found = list[np.ndarray]()
+        for key, tile in self.tiles.items():
+            ty, tx = divmod(key, self.tiles_x)
+            y, x = np.nonzero(tile)
+            found.append((y + ty * OCCUPANCY_TILE) * self.width + x + tx * OCCUPANCY_TILE)
+        return np.sort(np.concatenate(found))
+
+    def region_cells(self, left: int, top: int, right: int, bottom: int) -> np.ndarray:
+        # Looks up only the tiles the box overlaps. The tiles of one tile row
+        # are laid side by side, so a single nonzero yields them row-major.
+        found = list[np.ndarray]()
+        for ty in range(top // OCCUPANCY_TILE, (bottom - 1) // OCCUPANCY_TILE + 1):
+            keys = range(ty * self.tiles_x + left // OCCUPANCY_TILE, ty * self.tiles_x + (right - 1) // OCCUPANCY_TILE + 1)
+            present = [key for key in keys if key in self.tiles]
+            if not present:
+                continue
+            y, x = np.nonzero(np.hstack([self.tiles[key] for key in present]))
+            y = y + ty * OCCUPANCY_TILE
+            x = (np.array(present)[x // OCCUPANCY_TILE] - ty * self.tiles_x) * OCCUPANCY_TILE + x % OCCUPANCY_TILE
+            inside = (x >= left) & (x < right) & (y >= top) & (y < bottom)
+            found.append(y[inside] * self.width + x[inside])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def to_dense(self) -> np.ndarray:
+        grid = np.zeros((self.height, self.width), dtype=bool)
+        grid.flat[self.cells()] = True
+        return grid
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.tiles) * OCCUPANCY_TILE**2
+
+
+OCCUPANCY_BACKENDS: dict[str, type[Occupancy]] = {
+    "dense": DenseOccupancy,
+    "bitset": BitsetOccupancy,
+    "tiles": TileOccupancy,
+}
+
+
+def choose_occupancy(width: int, height: int, count: int = 0) -> type[Occupancy]:
+    # Dense bools while they stay small; past that, tiles unless the points
+    # could touch enough tiles to outgrow a bitset.
+    cells = width * height
+    if cells <= DENSE_OCCUPANCY_MAX_CELLS:
+        return DenseOccupancy
+    if count * OCCUPANCY_TILE**2 < height * ((width + 7) // 8):
+        return TileOccupancy
+    return BitsetOccupancy
+
+
+OCCUPIED_CHUNK = 4096
+OCCUPIED_BAND_CELLS = 2**20
+
+
+class BaseCanvas:
+    def __init__(
+        self, width: int, height: int, transform_stack: bool = False, occupancy: str | None = None
+    ) -> None:
         if width <= 0 or height <= 0:
             raise ValueError("Width and height must be positive values, got " + str(width) + " and " + str(height))
+        if occupancy is not None and occupancy not in OCCUPANCY_BACKENDS:
+            raise ValueError("Unknown occupancy backend " + repr(occupancy) + ", expected one of " + ", ".join(OCCUPANCY_BACKENDS))
         
         self.width = width
         self.height = height
-        self.grid_matrix: np.ndarray = np.zeros((height, width), dtype=bool)
-        self.points: list[PointType] = []
-        self.lines: list[LineType] = []
+        # None picks the backend from the canvas size and point count each
+        # time the occupancy is rebuilt.
+        self.occupancy_backend = occupancy
+        # With a transform stack, transform() only composes matrices; points
+        # and occupancy are recomputed from the source geometry the next
+        # time either is read.
+        self.transforms = TransformStack() if transform_stack else None
+        self.stale = False
+        self._occupancy = self.new_occupancy()
+        self._points = PointStore()
+        self.lines = LineStore()
+
+    @property
+    def points(self) -> PointStore:
+        if self.stale:
+            self.materialize()
+        return self._points
+
+    @points.setter
+    def points(self, points: PointStore) -> None:
+        self.flatten_transforms()
+        self._points = points
+
+    @property
+    def occupancy(self) -> Occupancy:
+        if self.stale:
+            self.materialize()
+        return self._occupancy
+
+    @occupancy.setter
+    def occupancy(self, occupancy: Occupancy) -> None:
+        self.flatten_transforms()
+        self._occupancy = occupancy
+
+    @property
+    def grid_matrix(self) -> np.ndarray:
+        # A dense bool view of the occupancy. Writable only with the dense
+        # backend; the others return a fresh copy.
+        return self.occupancy.to_dense()
+
+    def new_occupancy(self, count: int = 0) -> Occupancy:
+        if self.occupancy_backend is not None:
+            return OCCUPANCY_BACKENDS[self.occupancy_backend](self.width, self.height)
+        return choose_occupancy(self.width, self.height, count)(self.width, self.height)
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.width}, {self.height}, points_count={len(self.points)})"
@@ -113,16 +970,19 @@ class BaseCanvas:
         return (
             self.width == other.width
             and self.height == other.height
-            and self.grid_matrix == other.grid_matrix
+            and np.array_equal(self.occupancy.cells(), other.occupancy.cells())
         )
 
     def __ne__(self, value: object) -> bool:
         return not self.__eq__(value)
 
     def __add__(self, shape: Shape) -> "BaseCanvas":
+        self.flatten_transforms()
         if isinstance(shape, BasePoint):
             if 0 <= shape.x < self.width - 1 and 0 <= shape.y < self.height - 1:
-                self.grid_matrix[int(shape.y), int(shape.x)] = True
+                self.occupancy.set(int(shape.x), int(shape.y), True)
+                if self.occupancy_backend is None and self.occupancy.crowded():
+                    self.occupancy = BitsetOccupancy.from_cells(self.width, self.height, self.occupancy.cells())
             self.points.append(shape)
 
             return self
@@ -136,7 +996,8 @@ class BaseCanvas:
         if not (0 <= point.x < self.width - 1 and 0 <= point.y < self.height - 1):
             raise ValueError("Point coordinates must be within the canvas dimensions, got " + str(point.x) + ", " + str(point.y))
 
-        self.grid_matrix[int(point.y), int(point.x)] = False
+        self.flatten_transforms()
+        self.occupancy.set(int(point.x), int(point.y), False)
         self.points.remove(point)
         return self
 
@@ -144,34 +1005,121 @@ class BaseCanvas:
         if not (0 <= point.x < self.width - 1 and 0 <= point.y < self.height - 1):
             return False
 
-        return self.grid_matrix[int(point.y), int(point.x)]
+        return self.occupancy.get(int(point.x), int(point.y))
 
-    def __next__(self):
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.grid_matrix[y, x]:
-                    return Point(x, y)
-        raise StopIteration
+    def __iter__(self) -> Iterator[Point]:
+        # Occupied cells as Points, in row-major order.
+        for batch in self.occupied_cells():
+            for x, y in batch.tolist():
+                yield Point(x, y)
 
-    def __iter__(self):
-        return self
+    def occupied_cells(
+        self, chunk: int = OCCUPIED_CHUNK, region: tuple[int, int, int, int] | None = None
+    ) -> Iterator[np.ndarray]:
+        # Occupied cells as (k, 2) int arrays of x, y in row-major order, at
+        # most chunk rows each. region is a half-open box (left, top, right,
+        # bottom), clipped to the canvas. The canvas is scanned a band of rows
+        # at a time, so only the cells of one band are held at once.
+        if chunk <= 0:
+            raise ValueError("Chunk size must be positive, got " + str(chunk))
+        left, top, right, bottom = region or (0, 0, self.width, self.height)
+        left, top = max(int(left), 0), max(int(top), 0)
+        right, bottom = min(int(right), self.width), min(int(bottom), self.height)
+        if left >= right or top >= bottom:
+            return
+
+        # Bands are whole tile rows, aligned to the canvas, so tiled backends
+        # visit each tile once.
+        band = -(-max(1, OCCUPIED_BAND_CELLS // (right - left)) // OCCUPANCY_TILE) * OCCUPANCY_TILE
+        edges = [top, *range(top - top % band + band, bottom, band), bottom]
+        pending = np.empty(0, dtype=np.intp)
+        for start, stop in zip(edges, edges[1:]):
+            cells = self.occupancy.region_cells(left, start, right, stop)
+            pending = np.concatenate([pending, cells]) if len(pending) else cells
+            full = len(pending) - len(pending) % chunk
+            for offset in range(0, full, chunk):
+                yield self.cell_coordinates(pending[offset:offset + chunk])
+            pending = pending[full:]
+        if len(pending):
+            yield self.cell_coordinates(pending)
+
+    def cell_coordinates(self, cells: np.ndarray) -> np.ndarray:
+        y, x = np.divmod(cells, self.width)
+        return np.stack([x, y], axis=1)
 
     def clear(self) -> None:
-        self.grid_matrix = np.zeros((self.height, self.width), dtype=bool)
+        if self.transforms is not None:
+            self.transforms.clear()
+            self.stale = False
+        self.occupancy = self.new_occupancy()
         self.points.clear()
 
+    def scatter_grid(self, x: np.ndarray, y: np.ndarray) -> None:
+        # Rebuilds the occupancy from integral coordinates in one scatter,
+        # ignoring those outside the canvas.
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        cells = y[inside].astype(np.intp) * self.width + x[inside].astype(np.intp)
+        self._occupancy = self.new_occupancy(len(cells))
+        self._occupancy.fill(cells)
+
     def transform(self, matrix: np.ndarray) -> None:
         self.old_point = None
+        if self.transforms is None:
+            self._points = self.transformed_points(matrix, self._points)
+            self.scatter_grid(self._points.x, self._points.y)
+            return
+
+        if self.transforms.source is None:
+            self.transforms.source = (self._points, self._occupancy)
+        self.transforms.push(matrix)
+        self.stale = True
+
+    def transformed_points(self, matrix: np.ndarray, points: PointStore) -> PointStore:
+        # Rounds the moved points to integers and drops those off the canvas.
+        moved = np.round(affine_transform(matrix, points.coordinates())) + 0.0
+        x, y = moved[:, 0], moved[:, 1]
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        return PointStore.from_arrays(x[inside], y[inside])
 
-        new_grid_matrix: np.ndarray = np.zeros((self.height, self.width), dtype=bool)
-        new_points: list[PointType] = []
+    def materialize(self) -> None:
+        # Applies the composed matrix to the source geometry in one pass, so
+        # coordinates are rounded once however many transforms were stacked.
+        self.stale = False
+        points, occupancy = self.transforms.source
+        if not self.transforms.history:
+            self._points, self._occupancy = points, occupancy
+            return
+        self._points = self.transformed_points(self.transforms.matrix, points)
+        self.scatter_grid(self._points.x, self._points.y)
 
-        for x, y in self.points:
-            vec = np.array([x, y, 1])
-            x_new, y_new, _ = matrix @ vec
-            x_new, y_new = int(round(x_new)), int(round(y_new))
-            if 0 <= x_new < self.width and 0 <= y_new < self.height:
-                new_grid_matrix[y_new, x_new] = True
-                new_points.append(Point(x_new, y_new))
+    def flatten_transforms(self) -> None:
+        # Makes the current geometry the new source and forgets the history;
+        # called before any edit, since edits are not replayed.
+        if self.transforms is None or self.transforms.source is None:
+            return
+        if self.stale:
+            self.materialize()
+        self.transforms.clear()
+
+    def undo_transform(self) -> bool:
+        if self.transforms is None or not self.transforms.undo():
+            return False
+        self.old_point = None
+        self.stale = True
+        return True
+
+    def redo_transform(self) -> bool:
+        if self.transforms is None or not self.transforms.redo():
+            return False
+        self.old_point = None
+        self.stale = True
+        return True
 
-        self.points = new_points
+    def transform_lines(self, matrix: np.ndarray) -> None:
+        # Moves every line endpoint, truncated to integers, and replaces the
+        # points with the new endpoints in line order.
+        self.flatten_transforms()
+        moved = np.trunc(affine_transform(matrix, self.lines.segments().reshape(-1, 2))) + 0.0
+        self.lines.set_segments(moved.reshape(-1, 4))
+        self.points = PointStore.from_arrays(moved[:, 0], moved[:, 1])
+        self.scatter_grid(self.points.x, self.points.y)
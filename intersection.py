@@ -1,20 +1,730 @@
+import math
+from bisect import bisect_left
 import tkinter
 import numpy as np
-from typing import List, Sequence
-from geometry import Shape, PointType, Point, Line, BaseCanvas
+from itertools import combinations
+from typing import Iterable, Iterator, List, Sequence
+from geometry import Shape, PointType, LineType, BasePoint, Point, Line, BaseCanvas, LineStore, PointView
 
 WIDTH = 300
 HEIGHT = 300
 
+Box = tuple[float, float, float, float]
+
+INTERSECTION_CHUNK_PAIRS = 1 << 20
+
+POLYGON_OPERATIONS = ("intersection", "union", "difference")
+CLIP_EPS = 1e-9
+CLIP_MAX_PERTURBATIONS = 8
+CLIP_CONVEX_MAX_EDGES = 32
+
+EDGE_TABLE_BAND_EDGES = 8
+BOX_TREE_MAX_ENTRIES = 16
+INCREMENTAL_GRID_CELLS = 32
+INCREMENTAL_GRID_MAX_SPAN = 8
+
+
+def line_box(line: LineType) -> Box:
+    p1, p2 = line
+    return min(p1.x, p2.x), min(p1.y, p2.y), max(p1.x, p2.x), max(p1.y, p2.y)
+
+
+def boxes_overlap(a: Box, b: Box) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class SegmentGrid:
+    # Uniform grid of buckets over segment bounding boxes. Two segments can only
+    # intersect if their boxes overlap, and overlapping boxes share a cell.
+    def __init__(self, cell_size: float) -> None:
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive, got " + str(cell_size))
+
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], set[int]] = {}
+        self.boxes: dict[int, Box] = {}
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[LineType], cell_size: float | None = None) -> "SegmentGrid":
+        coords = lines_array(lines)
+        corners = np.concatenate(
+            [np.minimum(coords[:, :2], coords[:, 2:]), np.maximum(coords[:, :2], coords[:, 2:])], axis=1
+        )
+        boxes = [tuple(box) for box in corners.tolist()]
+        grid = cls(cell_size or cls.suggest_cell_size(boxes))
+        for key, box in enumerate(boxes):
+            grid.insert(key, box)
+        return grid
+
+    @staticmethod
+    def suggest_cell_size(boxes: Sequence[Box]) -> float:
+        # About one segment per cell: no smaller than a typical segment, so
+        # most segments land in a handful of cells.
+        if not boxes:
+            return 1.0
+        xmin = min(box[0] for box in boxes)
+        ymin = min(box[1] for box in boxes)
+        xmax = max(box[2] for box in boxes)
+        ymax = max(box[3] for box in boxes)
+        extent = max(xmax - xmin, ymax - ymin) / math.sqrt(len(boxes))
+        typical = sum(max(box[2] - box[0], box[3] - box[1]) for box in boxes) / len(boxes)
+        return max(extent, typical, 1e-9)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.boxes
+
+    def span(self, box: Box) -> int:
+        # Cells the box covers along its longer side.
+        return max(
+            math.floor(box[2] / self.cell_size) - math.floor(box[0] / self.cell_size),
+            math.floor(box[3] / self.cell_size) - math.floor(box[1] / self.cell_size),
+        ) + 1
+
+    def fit(self, box: Box) -> None:
+        # The cell size comes from the boxes the grid started with. A box
+        # much longer than a cell would cover the square of its span, so the
+        # grid is rebuilt at the size the boxes now suggest, once that is at
+        # least twice as coarse. Each rebuild doubles the cell size or more.
+        if self.span(box) <= INCREMENTAL_GRID_MAX_SPAN:
+            return
+        cell_size = self.suggest_cell_size([*self.boxes.values(), box])
+        if cell_size < 2 * self.cell_size:
+            return
+        boxes = self.boxes
+        self.cell_size = cell_size
+        self.cells = {}
+        self.boxes = {}
+        for key, item in boxes.items():
+            self.insert(key, item)
+
+    def covered_cells(self, box: Box) -> Iterable[tuple[int, int]]:
+        x0 = math.floor(box[0] / self.cell_size)
+        y0 = math.floor(box[1] / self.cell_size)
+        x1 = math.floor(box[2] / self.cell_size)
+        y1 = math.floor(box[3] / self.cell_size)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield cx, cy
+
+    def insert(self, key: int, box: Box) -> None:
+        if key in self.boxes:
+            self.remove(key)
+        self.boxes[key] = box
+        for cell in self.covered_cells(box):
+            self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: int) -> None:
+        box = self.boxes.pop(key)
+        for cell in self.covered_cells(box):
+            bucket = self.cells[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, box: Box) -> set[int]:
+        found = set[int]()
+        for cell in self.covered_cells(box):
+            for key in self.cells.get(cell, ()):
+                if key not in found and boxes_overlap(box, self.boxes[key]):
+                    found.add(key)
+        return found
+
+    def pairs(self) -> list[tuple[int, int]]:
+        found = set[tuple[int, int]]()
+        for bucket in self.cells.values():
+            for a, b in combinations(sorted(bucket), 2):
+                if (a, b) not in found and boxes_overlap(self.boxes[a], self.boxes[b]):
+                    found.add((a, b))
+        return sorted(found)
+
+
+def merge_boxes(a: Box, b: Box) -> Box:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def box_area(box: Box) -> float:
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+class BoxNode:
+    # Items carry the key of a stored box; inner nodes carry children.
+    __slots__ = ("box", "key", "children")
+
+    def __init__(self, box: Box | None, key: int | None = None, children: list["BoxNode"] | None = None) -> None:
+        self.box = box
+        self.key = key
+        self.children = children if children is not None else []
+
+    def refit(self) -> None:
+        self.box = self.children[0].box
+        for child in self.children[1:]:
+            self.box = merge_boxes(self.box, child.box)
+
+
+class BoxTree:
+    # R-tree over bounding boxes, grown one insert at a time. Unlike SegmentGrid
+    # it needs no cell size, so it copes with boxes of very different sizes,
+    # such as the polygons of a map.
+    def __init__(self, max_entries: int = BOX_TREE_MAX_ENTRIES) -> None:
+        if max_entries < 2:
+            raise ValueError("A node must hold at least two entries, got " + str(max_entries))
+
+        self.max_entries = max_entries
+        self.root = BoxNode(None)
+        self.height = 0
+        self.boxes: dict[int, Box] = {}
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.boxes
+
+    def insert(self, key: int, box: Box) -> None:
+        if key in self.boxes:
+            raise ValueError("Key is already in the tree: " + str(key))
+        self.boxes[key] = box
+
+        # Descend into the child whose box grows least, enlarging boxes on the
+        # way down, then split overflowing nodes on the way back up.
+        path = [self.root]
+        for _ in range(self.height):
+            path.append(min(
+                path[-1].children,
+                key=lambda child: (box_area(merge_boxes(child.box, box)) - box_area(child.box), box_area(child.box)),
+            ))
+        for node in path:
+            node.box = box if node.box is None else merge_boxes(node.box, box)
+        path[-1].children.append(BoxNode(box, key))
+
+        sibling = None
+        for node in reversed(path):
+            if sibling is not None:
+                node.children.append(sibling)
+            sibling = self.split(node) if len(node.children) > self.max_entries else None
+
+        if sibling is not None:
+            self.root = BoxNode(merge_boxes(self.root.box, sibling.box), children=[self.root, sibling])
+            self.height += 1
+
+    def remove(self, key: int) -> None:
+        box = self.boxes.pop(key)
+        path = self.path_to(key, box)
+        path[-1].children = [child for child in path[-1].children if child.key != key]
+
+        # Shrink the boxes on the way up and drop nodes left empty. Underfull
+        # nodes are kept, so every leaf stays at the same depth.
+        for parent, node in zip(reversed(path[:-1]), reversed(path[1:])):
+            if node.children:
+                node.refit()
+            else:
+                parent.children.remove(node)
+        if not self.root.children:
+            self.root = BoxNode(None)
+            self.height = 0
+            return
+        self.root.refit()
+        while self.height and len(self.root.children) == 1:
+            self.root = self.root.children[0]
+            self.height -= 1
+
+    def path_to(self, key: int, box: Box) -> list[BoxNode]:
+        # Nodes from the root down to the one holding key; only subtrees whose
+        # box meets the stored box can hold it.
+        stack = [[self.root]]
+        while stack:
+            path = stack.pop()
+            for child in path[-1].children:
+                if child.key == key:
+                    return path
+                if child.key is None and boxes_overlap(child.box, box):
+                    stack.append(path + [child])
+        raise KeyError(key)
+
+    @staticmethod
+    def split(node: BoxNode) -> BoxNode:
+        # Halve the children along the wider side of the node, keeping the first
+        # half in place and returning the second as a new sibling.
+        node.refit()
+        xmin, ymin, xmax, ymax = node.box
+        axis = 0 if xmax - xmin >= ymax - ymin else 1
+        node.children.sort(key=lambda child: child.box[axis] + child.box[axis + 2])
+        half = len(node.children) // 2
+        sibling = BoxNode(None, children=node.children[half:])
+        del node.children[half:]
+        sibling.refit()
+        return sibling
+
+    def query(self, box: Box) -> set[int]:
+        found = set[int]()
+        stack = [self.root] if self.boxes else []
+        while stack:
+            for child in stack.pop().children:
+                if boxes_overlap(box, child.box):
+                    if child.key is not None:
+                        found.add(child.key)
+                    else:
+                        stack.append(child)
+        return found
+
+    def query_point(self, x: float, y: float) -> set[int]:
+        return self.query((x, y, x, y))
+
+    def pairs(self) -> list[tuple[int, int]]:
+        found = list[tuple[int, int]]()
+        for key, box in self.boxes.items():
+            found.extend((key, other) for other in self.query(box) if key < other)
+        return sorted(found)
+
+
+def ring_box(ring: np.ndarray) -> Box:
+    xmin, ymin = ring.min(axis=0).tolist()
+    xmax, ymax = ring.max(axis=0).tolist()
+    return xmin, ymin, xmax, ymax
+
+
+def pair_intersections(
+    a: np.ndarray, b: np.ndarray, eps: float = 0.0, collinear: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    # Intersects segments a[..., :] with b[..., :] (x1, y1, x2, y2) elementwise,
+    # broadcasting over the leading axes. Returns the hit mask and the (..., 2)
+    # coordinates. Segments count as parallel when |sin| of their angle is at
+    # most eps, and eps is also the slack of the bounds checks; eps=0 is the
+    # exact test. Parallel segments never intersect unless collinear=True, in
+    # which case overlapping collinear pairs report the overlap point nearest
+    # to the start of a.
+    x1, y1, x2, y2 = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    x3, y3, x4, y4 = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+
+    denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    d12 = x1 * y2 - y1 * x2
+    d34 = x3 * y4 - y3 * x4
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (d12 * (x3 - x4) - (x1 - x2) * d34) / denom
+        y = (d12 * (y3 - y4) - (y1 - y2) * d34) / denom
+
+    if eps:
+        parallel = np.abs(denom) <= eps * np.hypot(x2 - x1, y2 - y1) * np.hypot(x4 - x3, y4 - y3)
+    else:
+        parallel = denom == 0
+
+    hit = (
+        ~parallel
+        & (np.minimum(x1, x2) - eps <= x) & (x <= np.maximum(x1, x2) + eps)
+        & (np.minimum(y1, y2) - eps <= y) & (y <= np.maximum(y1, y2) + eps)
+        & (np.minimum(x3, x4) - eps <= x) & (x <= np.maximum(x3, x4) + eps)
+        & (np.minimum(y3, y4) - eps <= y) & (y <= np.maximum(y3, y4) + eps)
+    )
+
+    if collinear:
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Distance of b's endpoints from the line through a, and their
+            # positions along a as fractions of its length.
+            off3 = np.abs(dx * (y3 - y1) - dy * (x3 - x1)) / np.sqrt(length2)
+            off4 = np.abs(dx * (y4 - y1) - dy * (x4 - x1)) / np.sqrt(length2)
+            t3 = (dx * (x3 - x1) + dy * (y3 - y1)) / length2
+            t4 = (dx * (x4 - x1) + dy * (y4 - y1)) / length2
+        low = np.maximum(np.minimum(t3, t4), 0.0)
+        high = np.minimum(np.maximum(t3, t4), 1.0)
+        slack = eps / np.sqrt(length2)
+        overlap = parallel & (length2 > 0) & (off3 <= eps) & (off4 <= eps) & (low <= high + slack)
+        low = np.minimum(low, 1.0)
+        x = np.where(overlap, x1 + low * dx, x)
+        y = np.where(overlap, y1 + low * dy, y)
+        hit = hit | overlap
+
+    return hit, np.stack([x, y], axis=-1)
+
+
+def segment_intersections(
+    a: np.ndarray,
+    b: np.ndarray,
+    eps: float = 0.0,
+    collinear: bool = False,
+    max_pairs: int = INTERSECTION_CHUNK_PAIRS,
+) -> tuple[np.ndarray, np.ndarray]:
+    # All intersections between the (N, 4) segments of a and the (M, 4)
+    # segments of b. Returns (K, 2) points and (K, 2) index pairs (i into a,
+    # j into b) in row-major (i, j) order. Rows of a are processed in chunks so
+    # no more than max_pairs candidate pairs are materialized at once.
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    rows = max(1, max_pairs // max(len(b), 1))
+
+    points = list[np.ndarray]()
+    pairs = list[np.ndarray]()
+    for start in range(0, len(a), rows):
+        hit, xy = pair_intersections(a[start:start + rows, np.newaxis, :], b[np.newaxis, :, :], eps, collinear)
+        i, j = np.nonzero(hit)
+        points.append(xy[i, j])
+        pairs.append(np.stack([i + start, j], axis=-1))
+
+    if not points:
+        return np.empty((0, 2)), np.empty((0, 2), dtype=np.intp)
+    return np.concatenate(points), np.concatenate(pairs)
+
+
+def lines_array(lines: Sequence[LineType]) -> np.ndarray:
+    if isinstance(lines, LineStore):
+        return lines.segments()
+    return np.array(
+        [(line.start.x, line.start.y, line.end.x, line.end.y) for line in lines], dtype=np.float64
+    ).reshape(-1, 4)
+
+
+def polygon_array(polygon: Sequence[PointType]) -> np.ndarray:
+    return np.array([(point.x, point.y) for point in polygon], dtype=np.float64).reshape(-1, 2)
+
+
+def ring_contains(ring: np.ndarray, x: float, y: float) -> bool:
+    # Crossing-number test, the same rule as TkinterCanvas.checkIfPointWithin.
+    xi, yi = ring[:, 0], ring[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    straddles = (yi > y) != (yj > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossings = straddles & (x <= (xj - xi) * (y - yi) / (yj - yi) + xi)
+    return bool(np.count_nonzero(crossings) % 2)
+
+
+class EdgeTable:
+    # Edges of one polygon bucketed into horizontal bands. An edge can only be
+    # crossed by the scanline through y if min(y) <= y < max(y), so a query
+    # point is tested against the edges of its own band and nothing else.
+    def __init__(self, ring: np.ndarray) -> None:
+        if len(ring) < 3:
+            raise ValueError("A polygon must have at least three points.")
+
+        self.ring = ring
+        xi, yi = ring[:, 0], ring[:, 1]
+        xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+        sloped = yi != yj
+        self.edges = np.stack([xi, yi, xj, yj], axis=1)[sloped]
+        low = np.minimum(yi, yj)[sloped]
+        high = np.maximum(yi, yj)[sloped]
+
+        self.ymin = float(yi.min())
+        self.ymax = float(yi.max())
+        height = max(self.ymax - self.ymin, 1e-9)
+
+        # Aim for EDGE_TABLE_BAND_EDGES edges per band beyond the ones every
+        # scanline crosses anyway, which bounds the table at O(edges) entries.
+        count = len(self.edges)
+        crossed = float((high - low).sum()) / height
+        self.bands = max(1, min(count, int(count * EDGE_TABLE_BAND_EDGES / max(crossed, 1.0))))
+        self.band_height = height / self.bands
+
+        first = self.band_of(low)
+        spans = self.band_of(high) - first + 1
+        edge_ids = np.repeat(np.arange(count), spans)
+        offsets = np.repeat(np.cumsum(spans) - spans, spans)
+        band_ids = np.repeat(first, spans) + np.arange(len(edge_ids)) - offsets
+
+        order = np.argsort(band_ids, kind="stable")
+        self.band_edges = edge_ids[order]
+        self.band_counts = np.bincount(band_ids, minlength=self.bands)
+        self.band_starts = np.cumsum(self.band_counts) - self.band_counts
+
+    def band_of(self, y: np.ndarray) -> np.ndarray:
+        band = np.floor((y - self.ymin) / self.band_height)
+        return np.clip(band, 0, self.bands - 1).astype(np.intp)
+
+    def contains(self, points: np.ndarray, chunk: int = INTERSECTION_CHUNK_PAIRS) -> np.ndarray:
+        # Crossing-number test for (N, 2) points, the same rule as
+        # ring_contains. Point-edge pairs are evaluated in chunks of at most
+        # about `chunk` pairs.
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        px, py = points[:, 0], points[:, 1]
+        inside = np.zeros(len(points), dtype=bool)
+
+        spanned = np.flatnonzero((py >= self.ymin) & (py < self.ymax))
+        bands = self.band_of(py[spanned])
+        counts = self.band_counts[bands]
+        ends = np.cumsum(counts)
+
+        start = 0
+        while start < len(spanned):
+            stop = max(int(np.searchsorted(ends, ends[start] - counts[start] + chunk, side="right")), start + 1)
+            ids, block, sizes = spanned[start:stop], bands[start:stop], counts[start:stop]
+            owners = np.repeat(np.arange(len(ids)), sizes)
+            offsets = np.repeat(np.cumsum(sizes) - sizes, sizes)
+            slots = np.repeat(self.band_starts[block], sizes) + np.arange(len(owners)) - offsets
+            xi, yi, xj, yj = self.edges[self.band_edges[slots]].T
+
+            x, y = px[ids][owners], py[ids][owners]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossings = ((yi > y) != (yj > y)) & (x <= (xj - xi) * (y - yi) / (yj - yi) + xi)
+            inside[ids] = np.bincount(owners[crossings], minlength=len(ids)) % 2 == 1
+            start = stop
+
+        return inside
+
+
+def signed_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2.0
+
+
+def drop_repeated_vertices(ring: np.ndarray) -> np.ndarray:
+    # Removes vertices equal to the one before them, the last wrapping to the
+    # first. Their zero-length edges look parallel to every other edge.
+    keep = (ring != np.roll(ring, 1, axis=0)).any(axis=1)
+    return ring[keep] if keep.any() else ring[:1]
+
+
+def ring_perimeter(ring: np.ndarray) -> float:
+    return float(np.hypot(*(np.roll(ring, -1, axis=0) - ring).T).sum())
+
+
+def is_convex(ring: np.ndarray) -> bool:
+    edges = np.roll(ring, -1, axis=0) - ring
+    turns = edges[:, 0] * np.roll(edges[:, 1], -1) - edges[:, 1] * np.roll(edges[:, 0], -1)
+    return bool((turns >= 0).all() or (turns <= 0).all())
+
+
+def clip_convex(subject: np.ndarray, clip: np.ndarray) -> np.ndarray:
+    # Sutherland-Hodgman: cut the subject ring by the half-plane of every clip
+    # edge in turn. Each pass is vectorized over the current subject ring.
+    if signed_area(clip) < 0:
+        clip = clip[::-1]
+
+    output = subject
+    for (ax, ay), (bx, by) in zip(clip, np.roll(clip, -1, axis=0)):
+        if not len(output):
+            break
+        current = output
+        following = np.roll(current, -1, axis=0)
+        side = (bx - ax) * (current[:, 1] - ay) - (by - ay) * (current[:, 0] - ax)
+        side_next = np.roll(side, -1)
+        inside, inside_next = side >= 0, side_next >= 0
+
+        crossing = inside != inside_next
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = side / (side - side_next)
+            cut = current + t[:, np.newaxis] * (following - current)
+
+        # Every vertex emits itself when inside, then the crossing point when
+        # its outgoing edge leaves or enters the half-plane.
+        keep = np.stack([inside, crossing], axis=1).ravel()
+        candidates = np.stack([current, cut], axis=1).reshape(-1, 2)
+        output = candidates[keep]
+
+    return output
+
+
+class ClipVertex:
+    __slots__ = ("x", "y", "next", "prev", "intersect", "entry", "neighbor", "visited")
+
+    def __init__(self, x: float, y: float, intersect: bool = False) -> None:
+        self.x = x
+        self.y = y
+        self.next: ClipVertex = self
+        self.prev: ClipVertex = self
+        self.intersect = intersect
+        self.entry = False
+        self.neighbor: ClipVertex | None = None
+        self.visited = False
+
+
+def link_ring(vertices: list[ClipVertex]) -> None:
+    for vertex, following in zip(vertices, vertices[1:] + vertices[:1]):
+        vertex.next = following
+        following.prev = vertex
+
+
+def edge_crossings(subject: np.ndarray, clip: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, bool]:
+    # Proper crossings between subject and clip edges found through the segment
+    # grid: edge indices i and j, and the fractions t and u along each edge.
+    # The last value is True when a crossing touches a vertex or edges overlap,
+    # which Greiner-Hormann cannot handle directly.
+    n = len(subject)
+    starts = np.concatenate([subject, clip])
+    ends = np.concatenate([np.roll(subject, -1, axis=0), np.roll(clip, -1, axis=0)])
+    boxes = np.concatenate([np.minimum(starts, ends), np.maximum(starts, ends)], axis=1)
+
+    grid = SegmentGrid(SegmentGrid.suggest_cell_size([tuple(box) for box in boxes.tolist()]))
+    for key, box in enumerate(boxes.tolist()):
+        grid.insert(key, tuple(box))
+    pairs = np.array([(a, b - n) for a, b in grid.pairs() if a < n <= b], dtype=np.intp).reshape(-1, 2)
+    i, j = pairs[:, 0], pairs[:, 1] + n
+
+    p, r = starts[i], ends[i] - starts[i]
+    q, s = starts[j], ends[j] - starts[j]
+    qp = q - p
+    denom = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / denom
+        u = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / denom
+
+    crossing = (denom != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    touching = crossing & ((t <= CLIP_EPS) | (t >= 1 - CLIP_EPS) | (u <= CLIP_EPS) | (u >= 1 - CLIP_EPS))
+    overlapping = (denom == 0) & (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0] == 0)
+    degenerate = bool(touching.any() or overlapping.any())
+    return i[crossing], j[crossing] - n, t[crossing], u[crossing], degenerate
+
+
+def greiner_hormann(subject: np.ndarray, clip: np.ndarray, operation: str) -> list[np.ndarray] | None:
+    i, j, t, u, degenerate = edge_crossings(subject, clip)
+    if degenerate:
+        return None
+
+    if not len(i):
+        return disjoint_boolean(subject, clip, operation)
+
+    points = subject[i] + t[:, np.newaxis] * (np.roll(subject, -1, axis=0)[i] - subject[i])
+    subject_cuts: dict[int, list[tuple[float, ClipVertex]]] = {}
+    clip_cuts: dict[int, list[tuple[float, ClipVertex]]] = {}
+    for edge_i, edge_j, alpha, beta, (x, y) in zip(i.tolist(), j.tolist(), t.tolist(), u.tolist(), points.tolist()):
+        on_subject = ClipVertex(x, y, intersect=True)
+        on_clip = ClipVertex(x, y, intersect=True)
+        on_subject.neighbor, on_clip.neighbor = on_clip, on_subject
+        subject_cuts.setdefault(edge_i, []).append((alpha, on_subject))
+        clip_cuts.setdefault(edge_j, []).append((beta, on_clip))
+
+    def build(ring: np.ndarray, cuts: dict[int, list[tuple[float, ClipVertex]]], other: np.ndarray, invert: bool) -> list[ClipVertex]:
+        vertices = list[ClipVertex]()
+        inside = ring_contains(other, *ring[0]) != invert
+        for index, (x, y) in enumerate(ring.tolist()):
+            vertices.append(ClipVertex(x, y))
+            for _, vertex in sorted(cuts.get(index, []), key=lambda cut: cut[0]):
+                vertex.entry = not inside
+                inside = not inside
+                vertices.append(vertex)
+        link_ring(vertices)
+        return vertices
+
+    # Intersection walks both rings forwards from their entry points, union
+    # walks the outside parts of both, and the difference walks the subject
+    # outside the clip and the clip inside the subject.
+    invert_subject, invert_clip = {
+        "intersection": (False, False),
+        "union": (True, True),
+        "difference": (True, False),
+    }[operation]
+    subject_ring = build(subject, subject_cuts, clip, invert_subject)
+    build(clip, clip_cuts, subject, invert_clip)
+
+    rings = list[np.ndarray]()
+    for start in subject_ring:
+        if not start.intersect or start.visited:
+            continue
+
+        ring = [(start.x, start.y)]
+        current = start
+        while True:
+            current.visited = True
+            assert current.neighbor is not None
+            current.neighbor.visited = True
+            forward = current.entry
+            while True:
+                current = current.next if forward else current.prev
+                ring.append((current.x, current.y))
+                if current.intersect:
+                    break
+            current.visited = True
+            assert current.neighbor is not None
+            current = current.neighbor
+            if current is start or current.neighbor is start:
+                break
+        rings.append(np.array(ring[:-1]))
+
+    return rings
+
+
+def disjoint_boolean(subject: np.ndarray, clip: np.ndarray, operation: str) -> list[np.ndarray]:
+    # Boundaries do not cross: one ring contains the other or they are apart.
+    subject_in_clip = ring_contains(clip, *subject[0])
+    clip_in_subject = ring_contains(subject, *clip[0])
+    if operation == "intersection":
+        if subject_in_clip:
+            return [subject]
+        return [clip] if clip_in_subject else []
+    if operation == "union":
+        if subject_in_clip:
+            return [clip]
+        return [subject] if clip_in_subject else [subject, clip]
+    if subject_in_clip:
+        return []
+    # The clip becomes a hole, traced against the subject's orientation.
+    if clip_in_subject:
+        return [subject, clip if signed_area(clip) * signed_area(subject) < 0 else clip[::-1]]
+    return [subject]
+
+
+def polygon_boolean(subject: np.ndarray, clip: np.ndarray, operation: str = "intersection") -> list[np.ndarray]:
+    # Boolean operation between two simple polygons given as (N, 2) vertex
+    # arrays. Returns the output rings with vertices in boundary order.
+    if operation not in POLYGON_OPERATIONS:
+        raise ValueError("Unknown polygon operation: " + operation)
+    subject = drop_repeated_vertices(np.asarray(subject, dtype=np.float64))
+    clip = drop_repeated_vertices(np.asarray(clip, dtype=np.float64))
+    if len(subject) < 3 or len(clip) < 3:
+        raise ValueError("A polygon must have at least three points.")
+
+    # Sutherland-Hodgman costs a pass over the subject per clip edge, so it only
+    # beats Greiner-Hormann against a small convex clip polygon.
+    if operation == "intersection" and len(clip) > len(subject):
+        subject, clip = clip, subject
+    if operation == "intersection" and len(clip) <= CLIP_CONVEX_MAX_EDGES and is_convex(clip) and is_convex(subject):
+        result = drop_repeated_vertices(clip_convex(subject, clip))
+        return [result] if len(result) >= 3 and signed_area(result) != 0 else []
+
+    # Vertices touching the other boundary are degenerate for Greiner-Hormann;
+    # nudging the clip polygon by a vanishing offset resolves them. The
+    # direction turns by the golden angle each attempt, since an offset along
+    # an edge keeps that edge collinear with its copy. Rings no larger than
+    # the boundary swept by the offset are slivers it created, such as what
+    # is left of a polygon minus itself.
+    scale = max(float(np.abs(np.concatenate([subject, clip])).max()), 1.0)
+    perimeter = ring_perimeter(subject) + ring_perimeter(clip)
+    for attempt in range(CLIP_MAX_PERTURBATIONS):
+        angle = 0.6478331 + 2.399963229728653 * attempt
+        offset = np.array([np.cos(angle), np.sin(angle)]) * scale * CLIP_EPS * (attempt * 10.0)
+        rings = greiner_hormann(subject, clip + offset, operation)
+        if rings is not None:
+            sliver = perimeter * float(np.hypot(*offset))
+            rings = [drop_repeated_vertices(ring) for ring in rings]
+            return [ring for ring in rings if len(ring) >= 3 and abs(signed_area(ring)) > sliver]
+    raise ValueError("Could not resolve degenerate polygon intersections.")
+
+
+def rings_overlap(a: EdgeTable, b: EdgeTable) -> bool:
+    # Whether two polygons share any point, boundaries touching included.
+    # Repeated vertices are dropped first: their zero-length edges would
+    # read as degenerate against any edge whose box they meet.
+    ring_a, ring_b = drop_repeated_vertices(a.ring), drop_repeated_vertices(b.ring)
+    crossings, _, _, _, degenerate = edge_crossings(ring_a, ring_b)
+    if len(crossings) or degenerate:
+        return True
+    # Boundaries apart: the polygons overlap only if one holds the other.
+    return bool(a.contains(ring_b[:1])[0] or b.contains(ring_a[:1])[0])
+
 
 class TkinterCanvas(BaseCanvas):
     def __init__(self, width: int = WIDTH, height: int = HEIGHT) -> None:
         super().__init__(width, height)
 
         self.polygons: List[List[PointType]] = []
+        self.edge_tables: List[EdgeTable] = []
+        self.polygon_ids: dict[int, int] = {}
+        self.polygon_tree = BoxTree()
         self.intersection_points: dict[PointType, List[PointType]] = {}
         self.inner_intersection_points: dict[PointType, List[PointType]] = {}
 
+        # Lines carry stable keys so intersection records survive deletions
+        # that shift positions in self.lines. Keys increase along self.lines,
+        # so a key's position is found by bisection. The segment grid exists
+        # while the intersections are maintained, from make_intersection_points on.
+        self.line_keys: List[int] = []
+        self.next_line_key = 0
+        self.intersection_records: dict[tuple[int, int], PointType] = {}
+        self.segment_grid: SegmentGrid | None = None
+
         self.tk_canvas = tkinter.Canvas(
             width=self.width, height=self.height, bg="white"
         )
@@ -35,12 +745,20 @@ class TkinterCanvas(BaseCanvas):
         if len(points) < 3:
             raise ValueError("A polygon must have at least three points.")
         
+        ring = polygon_array(points)
+        self.polygon_ids[id(points)] = len(self.polygons)
+        self.polygon_tree.insert(len(self.polygons), ring_box(ring))
         self.polygons.append(points)
+        self.edge_tables.append(EdgeTable(ring))
 
     def clear(self) -> None:
         super().clear()
         self.lines.clear()
+        self.line_keys.clear()
+        self.intersection_records.clear()
         self.intersection_points.clear()
+        self.inner_intersection_points.clear()
+        self.segment_grid = None
 
     def transform(self, matrix: np.ndarray) -> None:
         if matrix.shape != (3, 3):
@@ -48,121 +766,253 @@ class TkinterCanvas(BaseCanvas):
         if np.linalg.det(matrix) == 0:
             raise ValueError("Transformation matrix must be invertible (non-singular).")
 
-        self.points.clear()
-        self.grid_matrix = np.zeros((self.height, self.width), dtype=bool)
-
-        for i in range(len(self.lines)):
-            line = self.lines[i]
-            start_vec = np.array([line.start.x, line.start.y, 1])
-            end_vec = np.array([line.end.x, line.end.y, 1])
-            new_start_vec = matrix @ start_vec
-            new_end_vec = matrix @ end_vec
-
-            x0, y0 = int(new_start_vec[0]), int(new_start_vec[1])
-            x1, y1 = int(new_end_vec[0]), int(new_end_vec[1])
+        self.transform_lines(matrix)
 
-            point1 = Point(x0, y0)
-            point2 = Point(x1, y1)
-            line.start = point1
-            line.end = point2
-
-            self.lines[i] = line
-            self += point1
-            self += point2
-
-            if 0 <= x0 < self.width and 0 <= y0 < self.height:
-                self.grid_matrix[y0, x0] = True
-            if 0 <= x1 < self.width and 0 <= y1 < self.height:
-                self.grid_matrix[y1, x1] = True
+        # Every line moved, so maintained intersections are recomputed. The old
+        # intersection points went with self.points above.
+        if self.segment_grid is not None:
+            self.intersection_records.clear()
+            self.intersection_points.clear()
+            self.inner_intersection_points.clear()
+            self.make_intersection_points()
 
     def __add__(self, shape: Shape) -> "TkinterCanvas":
         super().__add__(shape)
+
+        if not isinstance(shape, BasePoint):
+            key = self.next_line_key
+            self.next_line_key += 1
+            self.line_keys.append(key)
+            if self.segment_grid is not None:
+                self.track_line(key)
+
         return self
     
     def __sub__(self, point: PointType) -> "TkinterCanvas":
         super().__sub__(point)
 
-        for i, line in enumerate(self.lines):
-            p1, p2 = line
-            if point == p1 or point == p2:
-                del self.lines[i]
-                break
+        segments = lines_array(self.lines)
+        touching = np.flatnonzero(
+            ((segments[:, 0] == point.x) & (segments[:, 1] == point.y))
+            | ((segments[:, 2] == point.x) & (segments[:, 3] == point.y))
+        )
+        if len(touching):
+            i = int(touching[0])
+            if self.segment_grid is not None:
+                self.untrack_line(self.line_keys[i])
+            del self.lines[i]
+            del self.line_keys[i]
 
         return self
+
+    def keyed_line(self, key: int) -> LineType:
+        return self.lines[bisect_left(self.line_keys, key)]
+
+    def track_line(self, key: int) -> None:
+        # Tests a new line only against the indexed lines its box touches.
+        line = self.keyed_line(key)
+        box = line_box(line)
+        self.segment_grid.fit(box)
+        others = sorted(self.segment_grid.query(box))
+        self.segment_grid.insert(key, box)
+        if not others:
+            return
+
+        rows = np.array([bisect_left(self.line_keys, other) for other in others])
+        hit, xy = pair_intersections(self.lines.segments(rows), lines_array([line]))
+        for other, (x, y) in zip(np.array(others)[hit].tolist(), xy[hit].tolist()):
+            p1, p2 = self.keyed_line(other)
+            p3, p4 = line
+            intersection = Point(x, y)
+            intersection["lines"] = [ (p1, p2), (p3, p4) ]
+            self.record_intersection(other, key, intersection)
+
+    def untrack_line(self, key: int) -> None:
+        # Only lines sharing a grid cell can have a record with this one.
+        partners = self.segment_grid.query(self.segment_grid.boxes[key])
+        self.drop_intersections([(min(key, other), max(key, other)) for other in partners])
+        self.segment_grid.remove(key)
     
     @staticmethod
     def get_lines_intersection(p1: PointType, p2: PointType, p3: PointType, p4: PointType) -> PointType | None:
-        denom = (p1.x - p2.x) * (p3.y - p4.y) - (p1.y - p2.y) * (p3.x - p4.x)
-        if denom == 0:
+        hit, xy = pair_intersections(
+            np.array([p1.x, p1.y, p2.x, p2.y], dtype=np.float64),
+            np.array([p3.x, p3.y, p4.x, p4.y], dtype=np.float64),
+        )
+        if not hit:
             return None
 
-        x_num = (p1.x * p2.y - p1.y * p2.x) * (p3.x - p4.x) - (p1.x - p2.x) * (p3.x * p4.y - p3.y * p4.x)
-        y_num = (p1.x * p2.y - p1.y * p2.x) * (p3.y - p4.y) - (p1.y - p2.y) * (p3.x * p4.y - p3.y * p4.x)
+        point = Point(float(xy[0]), float(xy[1]))
+        point["lines"] = [ (p1, p2), (p3, p4) ]
+        return point
 
-        x = x_num / denom
-        y = y_num / denom
+    def edge_table(self, polygon: List[PointType]) -> EdgeTable:
+        # Tables of the canvas's own polygons are built in make_polygon and
+        # kept until the points change.
+        i = self.polygon_ids.get(id(polygon))
+        if i is not None and self.polygons[i] is polygon:
+            return self.refresh_polygon(i)
+        return EdgeTable(polygon_array(polygon))
 
-        if (
-            min(p1.x, p2.x) <= x <= max(p1.x, p2.x)
-            and min(p1.y, p2.y) <= y <= max(p1.y, p2.y)
-            and min(p3.x, p4.x) <= x <= max(p3.x, p4.x)
-            and min(p3.y, p4.y) <= y <= max(p3.y, p4.y)
-        ):
-            point = Point(x, y)
-            point["lines"] = [ (p1, p2), (p3, p4) ]
-            return point
+    def refresh_polygon(self, i: int) -> EdgeTable:
+        # Polygons are the caller's point lists and may be edited after
+        # make_polygon, so the table and box are rebuilt when the vertices
+        # no longer match the ones they were built from.
+        ring = polygon_array(self.polygons[i])
+        if not np.array_equal(ring, self.edge_tables[i].ring):
+            self.edge_tables[i] = EdgeTable(ring)
+            self.polygon_tree.remove(i)
+            self.polygon_tree.insert(i, ring_box(ring))
+        return self.edge_tables[i]
 
-        return None
+    def refresh_polygons(self) -> None:
+        for i in range(len(self.polygons)):
+            self.refresh_polygon(i)
 
-    def checkIfPointWithin(self, point: PointType, polygon: List[PointType]) -> bool:
-        x = point.x
-        y = point.y
+    def points_within(self, points: np.ndarray, i: int) -> np.ndarray:
+        # Batch form of checkIfPointWithin for (N, 2) points against polygon i.
+        return self.refresh_polygon(i).contains(points)
 
-        inside = False
-        for i in range(len(polygon)):
-            xi, yi = polygon[i]
-            xj, yj = polygon[(i - 1) % len(polygon)]
+    def polygons_containing(self, point: PointType) -> List[int]:
+        # Only polygons whose bounding box holds the point are tested. Checking
+        # every polygon for edits would defeat the index, so this answers from
+        # the polygons as of the last refresh; call refresh_polygons() after
+        # editing their points.
+        query = np.array([(point.x, point.y)])
+        candidates = self.polygon_tree.query_point(point.x, point.y)
+        return sorted(i for i in candidates if self.edge_tables[i].contains(query)[0])
 
-            if ((yi > y) != (yj > y)) and (x <= (xj - xi) * (y - yi) / (yj - yi) + xi):
-                inside = not inside
+    def polygons_overlap(self, i: int, j: int) -> bool:
+        if not boxes_overlap(self.polygon_tree.boxes[i], self.polygon_tree.boxes[j]):
+            return False
+        return rings_overlap(self.edge_tables[i], self.edge_tables[j])
 
-        print(f"{point} within polygon: {inside}")
+    def overlapping_polygons(self) -> List[tuple[int, int]]:
+        self.refresh_polygons()
+        return [(i, j) for i, j in self.polygon_tree.pairs() if self.polygons_overlap(i, j)]
+
+    def checkIfPointWithin(self, point: PointType, polygon: List[PointType], verbose: bool = False) -> bool:
+        inside = bool(self.edge_table(polygon).contains(np.array([(point.x, point.y)]))[0])
+
+        if verbose:
+            print(f"{point} within polygon: {inside}")
 
         return inside
 
-    def make_intersection_points(self) -> None:
-        for i in range(len(self.lines)):
-            for j in range(i + 1, len(self.lines)):
-                p1, p2 = self.lines[i]
-                p3, p4 = self.lines[j]
-                intersection = self.get_lines_intersection(p1, p2, p3, p4)
-                if intersection:
-                    self += intersection
-                    self.intersection_points.setdefault(intersection, []).extend([p1, p2, p3, p4])
-                    if not (p1 == p2 or p3 == p4 or p1 == p3 or p1 == p4 or p2 == p3 or p2 == p4):
-                        self.inner_intersection_points.setdefault(intersection, []).extend([p1, p2, p3, p4])
-
-    def figure_intersections(self) -> List[PointType]:
-        if not self.intersection_points:
-            self.make_intersection_points()
+    def add_intersection(self, i: int, j: int, intersection: PointType) -> None:
+        self.record_intersection(self.line_keys[i], self.line_keys[j], intersection)
+
+    def record_intersection(self, a: int, b: int, intersection: PointType) -> None:
+        p1, p2 = self.keyed_line(a)
+        p3, p4 = self.keyed_line(b)
+        # The stored row stands in for the point from here on, so dropping the
+        # record can delete exactly that row.
+        self += intersection
+        intersection = self.points[-1]
+        self.intersection_records[(a, b)] = intersection
+        self.intersection_points.setdefault(intersection, []).extend([p1, p2, p3, p4])
+        if not (p1 == p2 or p3 == p4 or p1 == p3 or p1 == p4 or p2 == p3 or p2 == p4):
+            self.inner_intersection_points.setdefault(intersection, []).extend([p1, p2, p3, p4])
+
+    def drop_intersections(self, pairs: Iterable[tuple[int, int]]) -> None:
+        # Undoes record_intersection for the given line-key pairs, skipping
+        # pairs that never intersected.
+        dropped = list[PointType]()
+        for a, b in pairs:
+            intersection = self.intersection_records.pop((a, b), None)
+            if intersection is None:
+                continue
+
+            p1, p2 = self.keyed_line(a)
+            p3, p4 = self.keyed_line(b)
+            targets = [self.intersection_points]
+            if not (p1 == p2 or p3 == p4 or p1 == p3 or p1 == p4 or p2 == p3 or p2 == p4):
+                targets.append(self.inner_intersection_points)
+            for target in targets:
+                endpoints = target[intersection]
+                for endpoint in (p1, p2, p3, p4):
+                    endpoints.remove(endpoint)
+                if not endpoints:
+                    del target[intersection]
+            dropped.append(intersection)
+
+        self.discard_points(dropped)
 
-        if not self.polygons:
+    def discard_points(self, points: Sequence[PointView]) -> None:
+        # Removes exactly these rows of self.points, keeping the grid cells that
+        # other points still occupy.
+        self.points.settle()
+        rows = [point.row for point in points if point.store is self.points]
+        if not rows:
+            return
+
+        def cells(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+            inside = (x >= 0) & (x < self.width - 1) & (y >= 0) & (y < self.height - 1)
+            return y[inside].astype(np.intp) * self.width + x[inside].astype(np.intp)
+
+        cleared = cells(self.points.x[rows], self.points.y[rows])
+        self.points.delete_rows(np.array(rows))
+        remaining = cells(self.points.x, self.points.y)
+        self.occupancy.fill(cleared, False)
+        self.occupancy.fill(remaining[np.isin(remaining, cleared)])
+
+    def make_intersection_points(self, indexed: bool = True) -> None:
+        # Computes the intersections from scratch and keeps them up to date as
+        # lines are added and removed afterwards.
+        self.drop_intersections(list(self.intersection_records))
+        self.line_keys = list(range(len(self.lines)))
+        self.next_line_key = len(self.lines)
+
+        if self.lines:
+            self.segment_grid = SegmentGrid.from_lines(self.lines)
+        else:
+            self.segment_grid = SegmentGrid(max(self.width, self.height) / INCREMENTAL_GRID_CELLS)
+
+        for i, j, intersection in intersecting_pairs(self.lines, indexed, self.segment_grid):
+            self.add_intersection(i, j, intersection)
+
+    def figure_intersections(self, i: int = 0, j: int = 1, operation: str = "intersection") -> List[List[PointType]]:
+        # Boolean of polygons i and j as rings of points in boundary order.
+        if max(i, j) >= len(self.polygons):
             raise ValueError("No polygons defined on the canvas.")
 
-        figure_points = list[PointType]()
-        polygon_points = self.polygons[0]
-        other_polygon = self.polygons[1]
-        
-        for point in polygon_points:
-            if self.checkIfPointWithin(point, other_polygon):
-                figure_points.append(point)          
-        
-        for point in other_polygon:
-            if self.checkIfPointWithin(point, polygon_points):
-                figure_points.append(point)
+        self.refresh_polygon(i)
+        self.refresh_polygon(j)
+        if operation == "intersection" and not boxes_overlap(self.polygon_tree.boxes[i], self.polygon_tree.boxes[j]):
+            return []
+
+        rings = polygon_boolean(self.edge_tables[i].ring, self.edge_tables[j].ring, operation)
+        return [[Point(x, y) for x, y in ring.tolist()] for ring in rings]
+
+    def overlap_intersections(self) -> dict[tuple[int, int], List[List[PointType]]]:
+        # Intersections of every overlapping pair, leaving all other pairs alone.
+        return {(i, j): self.figure_intersections(i, j) for i, j in self.overlapping_polygons()}
+
+
+def intersecting_pairs(
+    lines: Sequence[LineType], indexed: bool = True, grid: SegmentGrid | None = None
+) -> Iterator[tuple[int, int, PointType]]:
+    # Both paths report every hit in the (i, j) order of a pairwise loop: the
+    # grid only prunes pairs whose boxes cannot touch. An existing grid over
+    # the lines, keyed by position, can be passed in to be reused.
+    coords = lines_array(lines)
+    if indexed:
+        grid = grid if grid is not None else SegmentGrid.from_lines(lines)
+        candidates = np.array(grid.pairs(), dtype=np.intp).reshape(-1, 2)
+        hit, xy = pair_intersections(coords[candidates[:, 0]], coords[candidates[:, 1]])
+        points, pairs = xy[hit], candidates[hit]
+    else:
+        points, pairs = segment_intersections(coords, coords)
+        upper = pairs[:, 0] < pairs[:, 1]
+        points, pairs = points[upper], pairs[upper]
+
+    for (i, j), (x, y) in zip(pairs.tolist(), points.tolist()):
+        p1, p2 = lines[i]
+        p3, p4 = lines[j]
+        point = Point(x, y)
+        point["lines"] = [ (p1, p2), (p3, p4) ]
+        yield i, j, point
 
-        figure_points.extend(self.inner_intersection_points.keys())
-        return figure_points    
 
 if __name__ == "__main__":
     canvas = TkinterCanvas(WIDTH, HEIGHT)
@@ -193,7 +1043,7 @@ if __name__ == "__main__":
     canvas += Line(p6, p5)
     canvas += Line(p5, p7)
     canvas += Line(p7, p4)
-    canvas.make_polygon([p4, p5, p6, p7])
+    canvas.make_polygon([p4, p6, p5, p7])
 
     canvas.make_intersection_points()
     print("Intersection Points:", len(canvas.inner_intersection_points))
@@ -211,36 +1061,19 @@ if __name__ == "__main__":
         p1, p2 = line
         canvas.tk_canvas.create_line(p1.x, p1.y, p2.x, p2.y, fill="red")
 
-    for y in range(HEIGHT):
-        for x in range(WIDTH):
-            if canvas.grid_matrix[y, x]:
-                canvas.tk_canvas.create_rectangle(x - 1, y - 1, x + 1, y + 1, fill="black")
-
-    inner_points = list[PointType]()
-    polygon_center = Point(0, 0)
-
-    for intersection in canvas.figure_intersections():
-        polygon_center.x += intersection.x
-        polygon_center.y += intersection.y
-        inner_points.append(intersection)
-        canvas.tk_canvas.create_oval(
-            intersection.x - 3, intersection.y - 3,
-            intersection.x + 3, intersection.y + 3,
-            fill="blue"
-        )
-    
-    polygon_center.x /= len(inner_points)
-    polygon_center.y /= len(inner_points)
+    for x, y in canvas:
+        canvas.tk_canvas.create_rectangle(x - 1, y - 1, x + 1, y + 1, fill="black")
 
-    if inner_points:
-        sorted_points = sorted(
-            inner_points,
-            key=lambda p: np.arctan2(p.y - polygon_center.y, p.x - polygon_center.x),
+    for ring in canvas.figure_intersections():
+        polygon_center = Point(
+            sum(point.x for point in ring) / len(ring),
+            sum(point.y for point in ring) / len(ring),
         )
 
-        for i in range(len(sorted_points)):
-            a = sorted_points[i]
-            b = sorted_points[(i + 1) % len(sorted_points)]
+        for i in range(len(ring)):
+            a = ring[i]
+            b = ring[(i + 1) % len(ring)]
+            canvas.tk_canvas.create_oval(a.x - 3, a.y - 3, a.x + 3, a.y + 3, fill="blue")
             canvas.tk_canvas.create_line(a.x, a.y, b.x, b.y, fill="green", dash=(2, 1), width=3)
 
             canvas.tk_canvas.create_line(
@@ -249,10 +1082,10 @@ if __name__ == "__main__":
                 fill="black", dash=(2, 4)
             )
 
-    canvas.tk_canvas.create_oval(
-        polygon_center.x - 3, polygon_center.y - 3,
-        polygon_center.x + 3, polygon_center.y + 3,
-        fill="green"
-    )
+        canvas.tk_canvas.create_oval(
+            polygon_center.x - 3, polygon_center.y - 3,
+            polygon_center.x + 3, polygon_center.y + 3,
+            fill="green"
+        )
 
     canvas.tk_canvas.mainloop()
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from intersection import (
+    POLYGON_OPERATIONS,
+    EdgeTable,
+    SegmentGrid,
+    boxes_overlap,
+    polygon_boolean,
+    rings_overlap,
+    signed_area,
+)
+
+SQUARE = np.array([[0, 0], [4, 0], [4, 4], [0, 4]], dtype=np.float64)
+L_SHAPE = np.array([[0, 0], [4, 0], [4, 2], [2, 2], [2, 4], [0, 4]], dtype=np.float64)
+# Has an edge that lay along the first perturbation direction, so shifting a
+# copy of it never removed the overlap.
+STAR = np.array(
+    [[26, 28], [12, 25], [9, 11], [18, 13], [19, 12], [21, 16], [25, 13], [30, 16], [34, 19]],
+    dtype=np.float64,
+)
+
+
+def total_area(rings: list[np.ndarray]) -> float:
+    # Holes come back against the orientation of their outer ring. Areas are
+    # only exact up to the perturbation used for degenerate inputs.
+    return abs(sum(signed_area(ring) for ring in rings))
+
+
+def test_repeated_vertices_are_ignored() -> None:
+    subject = np.array([[0, 0], [4, 0], [4, 0], [4, 4], [0, 4], [0, 0]], dtype=np.float64)
+    clip = np.array([[2, 2], [2, 2], [6, 2], [6, 6], [2, 6]], dtype=np.float64)
+    expected = {"intersection": 4.0, "union": 28.0, "difference": 12.0}
+    for operation in POLYGON_OPERATIONS:
+        rings = polygon_boolean(subject, clip, operation)
+        assert total_area(rings) == pytest.approx(expected[operation], abs=1e-6)
+        for ring in rings:
+            assert not (ring == np.roll(ring, 1, axis=0)).all(axis=1).any()
+
+
+def test_repeated_vertices_touching_the_other_boundary() -> None:
+    # The zero-length edge sits on the clip's edge, which made every
+    # perturbation look degenerate.
+    subject = np.array([[0, 0], [4, 0], [4, 2], [4, 2], [4, 4], [0, 4]], dtype=np.float64)
+    clip = np.array([[4, 0], [8, 0], [8, 4], [4, 4]], dtype=np.float64)
+    assert total_area(polygon_boolean(subject, clip, "union")) == pytest.approx(32.0, abs=1e-6)
+    assert total_area(polygon_boolean(subject, clip, "difference")) == pytest.approx(16.0, abs=1e-6)
+
+
+def test_too_few_distinct_vertices() -> None:
+    with pytest.raises(ValueError):
+        polygon_boolean(np.array([[0, 0], [1, 1], [1, 1], [0, 0]], dtype=np.float64), SQUARE)
+
+
+def test_shared_edge() -> None:
+    neighbor = SQUARE + [4, 0]
+    assert total_area(polygon_boolean(SQUARE, neighbor, "intersection")) == pytest.approx(0.0, abs=1e-6)
+    assert total_area(polygon_boolean(SQUARE, neighbor, "union")) == pytest.approx(32.0, abs=1e-6)
+    assert total_area(polygon_boolean(SQUARE, neighbor, "difference")) == pytest.approx(16.0, abs=1e-6)
+
+
+def test_shared_partial_edge() -> None:
+    clip = np.array([[4, 1], [6, 1], [6, 3], [4, 3]], dtype=np.float64)
+    assert total_area(polygon_boolean(SQUARE, clip, "union")) == pytest.approx(20.0, abs=1e-6)
+    assert total_area(polygon_boolean(SQUARE, clip, "difference")) == pytest.approx(16.0, abs=1e-6)
+
+
+def test_repeated_vertex_does_not_overlap_disjoint_polygon() -> None:
+    # The zero-length edge of the repeated vertex lies in the other
+    # triangle's bounding box but nowhere near its edges.
+    subject = EdgeTable(np.array([[0, 0], [10, 0], [10, 0], [0, 10]], dtype=np.float64))
+    clip = EdgeTable(np.array([[8, -3], [14, 3], [20, -3]], dtype=np.float64))
+    assert not rings_overlap(subject, clip)
+    assert not rings_overlap(clip, subject)
+    touching = EdgeTable(np.array([[10, 0], [14, 3], [20, -3]], dtype=np.float64))
+    assert rings_overlap(subject, touching)
+
+
+@pytest.mark.parametrize("polygon", [SQUARE, L_SHAPE, STAR], ids=["square", "l-shape", "star"])
+def test_identical_polygons(polygon: np.ndarray) -> None:
+    area = abs(signed_area(polygon))
+    assert total_area(polygon_boolean(polygon, polygon.copy(), "intersection")) == pytest.approx(area, rel=1e-6)
+    assert total_area(polygon_boolean(polygon, polygon.copy(), "union")) == pytest.approx(area, rel=1e-6)
+    assert polygon_boolean(polygon, polygon.copy(), "difference") == []
+
+
+def test_segment_grid_grows_for_long_segments() -> None:
+    # Short segments in one corner give a fine grid; long ones added after
+    # it must not be bucketed into thousands of its cells.
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 100, (200, 2))
+    short = np.concatenate([starts, starts + rng.uniform(1, 8, (200, 2))], axis=1)
+    boxes = {key: tuple(box) for key, box in enumerate(short.tolist())}
+    grid = SegmentGrid(SegmentGrid.suggest_cell_size(list(boxes.values())))
+    for key, box in boxes.items():
+        grid.insert(key, box)
+    fine = grid.cell_size
+
+    for key in range(200, 220):
+        x, y = rng.uniform(0, 100, 2)
+        box = (x, y, x + rng.uniform(1400, 1500), y + rng.uniform(1400, 1500))
+        grid.fit(box)
+        grid.insert(key, box)
+        boxes[key] = box
+
+    assert grid.cell_size >= 2 * fine
+    assert len(grid.cells) < 10 * len(boxes)
+    expected = [(a, b) for a in boxes for b in boxes if a < b and boxes_overlap(boxes[a], boxes[b])]
+    assert grid.pairs() == expected
+    query = (50.0, 50.0, 60.0, 60.0)
+    assert grid.query(query) == {key for key, box in boxes.items() if boxes_overlap(query, box)}